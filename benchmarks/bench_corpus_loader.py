@@ -0,0 +1,130 @@
+# Memory benchmark of corpus_loader against the notebook's loading code.
+# Writes a synthetic corpus as the two scraped CSVs, then loads it the way
+# the notebook did (every column as objects, concat, drop, shuffle, wordopt)
+# and with corpus_loader, first parsing the CSVs and then from its cache.
+# Every approach runs in a fresh process so its peak resident memory is its
+# own (read from /proc, so Linux only); with pyarrow the peak of a cached
+# load includes the pages of the memory-mapped cache file, which the
+# system can drop at any time. The report also gives the size of the
+# resulting frame:
+#
+#     python -m benchmarks.bench_corpus_loader --size 1m --data-dir /tmp/corpus
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+import corpus_loader
+import text_normalizer
+from benchmarks import synthetic_corpus
+
+
+# Function to load the corpus as the notebook did before corpus_loader
+def notebook_load(fake_path, true_path):
+    data_fake = pd.read_csv(fake_path)
+    data_true = pd.read_csv(true_path, encoding="ISO-8859-1")
+    data_merge = pd.concat([data_fake, data_true], axis=0)
+    data = data_merge.drop(["Headline", "Category", "Published Date"], axis=1)
+    data = data.sample(frac=1)
+    data.reset_index(inplace=True)
+    data.drop(["index"], axis=1, inplace=True)
+    data["Content"] = text_normalizer.wordopt_batch(data["Content"])
+    return data
+
+
+# Function to load the corpus with corpus_loader, as the notebook now does
+def loader_load(fake_path, true_path, cache_dir):
+    return corpus_loader.load_corpus(
+        fake_path, true_path, normalized=True, shuffle=True, cache_dir=cache_dir
+    )
+
+
+# Function to read the current and peak resident memory of this process in
+# kilobytes from /proc
+def resident_kb():
+    sizes = {}
+    with open("/proc/self/status", encoding="ascii") as status:
+        for line in status:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                name, value = line.split(":")
+                sizes[name] = int(value.split()[0])
+    return sizes["VmRSS"], sizes["VmHWM"]
+
+
+# Function run in a fresh process: load the corpus one way and measure it.
+# The peak is reset first, as a spawned process starts with the peak of
+# the process it was forked from.
+def measure(approach, fake_path, true_path, cache_dir):
+    with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+        clear_refs.write("5")
+    baseline, _ = resident_kb()
+    start = time.perf_counter()
+    if approach == "notebook":
+        data = notebook_load(fake_path, true_path)
+    else:
+        data = loader_load(fake_path, true_path, cache_dir)
+    return {
+        "seconds": time.perf_counter() - start,
+        "rows": len(data),
+        "frame_mb": corpus_loader.memory_bytes(data) / 2**20,
+        "peak_mb": (resident_kb()[1] - baseline) / 2**10,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=list(synthetic_corpus.SIZES), default="1m")
+    parser.add_argument("--rows", type=int, help="overrides --size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--data-dir", help="directory to write the CSVs to and reuse them from"
+    )
+    args = parser.parse_args()
+
+    rows = args.rows or synthetic_corpus.SIZES[args.size]
+    work_dir = tempfile.mkdtemp(prefix="bench_corpus_loader_")
+    data_dir = args.data_dir or os.path.join(work_dir, "data")
+    paths = [
+        os.path.join(data_dir, corpus_loader.FAKE_CSV),
+        os.path.join(data_dir, corpus_loader.TRUE_CSV),
+    ]
+    if not all(os.path.isfile(path) for path in paths):
+        start = time.perf_counter()
+        paths = synthetic_corpus.write_csvs(rows, data_dir, args.seed)
+        print(f"Wrote {rows} rows in {time.perf_counter() - start:.0f}s")
+    csv_mb = sum(os.path.getsize(path) for path in paths) / 2**20
+    print(
+        f"text dtype: {corpus_loader.TEXT_DTYPE}, cache: {corpus_loader.CACHE_FORMAT},"
+        f" CSVs: {csv_mb:.0f} MB"
+    )
+    print(f"{'approach':<16}{'rows':>10}{'seconds':>9}{'frame MB':>10}{'peak MB':>9}")
+
+    cache_dir = os.path.join(work_dir, "cache")
+    context = multiprocessing.get_context("spawn")
+    try:
+        for label, approach in (
+            ("notebook", "notebook"),
+            ("loader (parse)", "loader"),
+            ("loader (cache)", "loader"),
+        ):
+            with context.Pool(1) as pool:
+                result = pool.apply(measure, (approach, *paths, cache_dir))
+            print(
+                f"{label:<16}{result['rows']:>10}{result['seconds']:>9.1f}"
+                f"{result['frame_mb']:>10.0f}{result['peak_mb']:>9.0f}"
+            )
+        cache_files = os.listdir(cache_dir)
+        cache_mb = sum(
+            os.path.getsize(os.path.join(cache_dir, name)) for name in cache_files
+        )
+        print(f"cache file: {cache_mb / 2**20:.0f} MB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Benchmark of the concurrent crawl engine against a serial crawl.
+# Runs the real crawler over every source against a local stub server that
+# serves canned HTML with an artificial per-request latency, so the
+# comparison works offline:
+#
+#     python -m benchmarks.bench_crawl_engine --latency 0.05 --workers 16
+import argparse
+import time
+
+import crawl_engine
+import crawl_frontier
+import crawler
+import dedup_index
+import html_archive
+import http_cache
+import news_fake_scrapping
+from benchmarks.stub_server import serve, stub_sources
+
+
+# Function to crawl every source once against the stub server
+def crawl(base_url):
+    sources = stub_sources(base_url)
+    return crawler.crawl(news_fake_scrapping.clean_and_preprocess, sources=sources)
+
+
+# Function to time one crawl with the given engine limits
+def timed_crawl(server, workers, per_host):
+    crawl_engine.configure(workers=workers, per_host=per_host, rate_limit=False)
+    server.request_count = 0
+    start = time.perf_counter()
+    dataframe = crawl(server.base_url)
+    elapsed = time.perf_counter() - start
+    return elapsed, server.request_count, dataframe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=crawl_engine.DEFAULT_WORKERS)
+    parser.add_argument("--per-host", type=int, default=crawl_engine.DEFAULT_WORKERS)
+    args = parser.parse_args()
+    # Every run must crawl everything from the stub server, not skip known or
+    # duplicate articles, answer from the response cache or archive the
+    # pages, and at full speed: the engine is measured, not the sites' rate
+    # limits
+    http_cache.configure(enabled=False)
+    crawl_frontier.configure(enabled=False)
+    dedup_index.configure(enabled=False)
+    html_archive.configure(enabled=False)
+
+    with serve(latency=args.latency) as server:
+        serial_time, requests_made, serial_frame = timed_crawl(server, 1, 1)
+        engine_time, _, engine_frame = timed_crawl(server, args.workers, args.per_host)
+
+    # Concurrent sections interleave their records, so compare sorted rows
+    columns = list(serial_frame.columns)
+    assert (
+        serial_frame.sort_values(columns)
+        .reset_index(drop=True)
+        .equals(engine_frame.sort_values(columns).reset_index(drop=True))
+    ), "concurrent crawl changed the output"
+
+    print(f"requests per crawl: {requests_made}, rows: {len(engine_frame)}")
+    print(f"serial:     {serial_time:8.2f}s")
+    print(
+        f"concurrent: {engine_time:8.2f}s "
+        f"(workers={args.workers}, per_host={args.per_host})"
+    )
+    print(f"speedup:    {serial_time / engine_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
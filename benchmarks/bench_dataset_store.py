@@ -0,0 +1,68 @@
+# Benchmark of seeding the dataset store from a news CSV and compacting it
+# back, as both scrapers do on a fresh clone. Writes a synthetic corpus in
+# the layout compact() gives news_true.csv and news_fake.csv (ISO dates,
+# sorted by category), imports it through each scraper's
+# normalize_existing_data, compacts the store again and checks every row
+# comes back with its category, date and label (the true news scraper also
+# cleans the text on import):
+#
+#     python -m benchmarks.bench_dataset_store --documents 100000
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+import dataset_store
+import news_fake_scrapping
+import news_true_scrapping
+from benchmarks import synthetic_corpus
+
+# Scraper module of every corpus and the label of its rows
+CORPORA = {"true": (news_true_scrapping, 1), "fake": (news_fake_scrapping, 0)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = synthetic_corpus.generate(args.documents, args.seed)
+    data = data.drop_duplicates("Headline").sort_values("Category", kind="stable")
+    work_dir = tempfile.mkdtemp(prefix="bench_dataset_store_")
+    try:
+        print(f"{'corpus':<8}{'rows':>10}{'import s':>10}{'compact s':>11}")
+        for corpus, (scraper, label) in CORPORA.items():
+            rows = data[dataset_store.COLUMNS].assign(Label=label)
+            csv_path = os.path.join(work_dir, f"news_{corpus}.csv")
+            rows.to_csv(csv_path, index=False, encoding="utf-8-sig")
+            store_dir = os.path.join(work_dir, "dataset")
+
+            start = time.perf_counter()
+            dataset_store.import_csv(
+                corpus, csv_path, scraper.normalize_existing_data, store_dir
+            )
+            import_seconds = time.perf_counter() - start
+            output_path = os.path.join(work_dir, f"compacted_{corpus}.csv")
+            start = time.perf_counter()
+            written = dataset_store.compact(corpus, output_path, directory=store_dir)
+            compact_seconds = time.perf_counter() - start
+
+            before = pd.read_csv(csv_path, dtype=str)
+            after = pd.read_csv(output_path, dtype=str)
+            assert after["Published Date"].notna().all(), "import lost dates"
+            kept = ["Category", "Published Date", "Label"]
+            assert before[kept].equals(after[kept]), f"{corpus} rows changed on import"
+            print(
+                f"{corpus:<8}{written:>10}{import_seconds:>10.2f}"
+                f"{compact_seconds:>11.2f}"
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# Benchmark of selector-targeted extraction against full html.parser trees.
+# Parses every saved HTML fixture with the original BeautifulSoup code and
+# with extraction.py, checks both give the same fields, and reports the
+# per-document parse time and peak memory of each:
+#
+#     python -m benchmarks.bench_extraction --repeat 50
+import argparse
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+import extraction
+from benchmarks.stub_server import load_fixture
+
+
+# Original extraction code of the scrapers, kept as the baseline
+def baseline_the_hindu_listing(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    return [
+        {"headline": item.get_text().strip(), "link": item.find("a").get("href")}
+        for item in soup.find_all("h3", class_="title")
+    ]
+
+
+def baseline_the_hindu_article(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    body = soup.find("h2", class_="sub-title")
+    date_element = soup.find("p", class_="publish-time-new")
+    span = date_element.find("span") if date_element else None
+    return {
+        "content": body.get_text().strip() if body else None,
+        "date": span.get_text().strip() if span else None,
+    }
+
+
+def baseline_boom_live_listing(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    items = []
+    for item in soup.find_all("h4", class_="font-alt normal"):
+        link_tag = item.find("a", class_="heading_link")
+        items.append(
+            {
+                "headline": item.get_text().strip(),
+                "link": link_tag.get("href") if link_tag else None,
+            }
+        )
+    return items
+
+
+def baseline_boom_live_article(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    return {
+        "content": soup.find("p").get_text().strip() if soup.find("p") else None,
+        "date": (
+            soup.find("span", class_="convert-to-localtime").get_text().strip()
+            if soup.find("span", class_="convert-to-localtime")
+            else None
+        ),
+    }
+
+
+def baseline_natural_news_listing(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    items = []
+    for article in soup.find_all("div", class_="Text"):
+        headline = article.find("div", class_="Headline")
+        description = article.find("div", class_="Description")
+        date = article.find("div", class_="Date")
+        link_tag = headline.find("a") if headline else None
+        items.append(
+            {
+                "headline": headline.text.strip() if headline else None,
+                "content": description.text.strip() if description else None,
+                "date": date.text.strip() if date else None,
+                "link": link_tag.get("href") if link_tag else None,
+            }
+        )
+    return items
+
+
+def baseline_fauxy_listing(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    items = []
+    for item in soup.find_all("h2", class_="entry-title"):
+        link_tag = item.find("a")
+        items.append(
+            {
+                "headline": item.get_text().strip(),
+                "link": link_tag.get("href") if link_tag else None,
+            }
+        )
+    return items
+
+
+def baseline_fauxy_article(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    date_element = soup.find("li", class_="meta-updated-date")
+    time_element = date_element.find("time") if date_element else None
+    return {
+        "content": soup.find("p").get_text().strip() if soup.find("p") else None,
+        "date": time_element.get("datetime") if time_element else None,
+    }
+
+
+CASES = [
+    ("the_hindu", "listing", baseline_the_hindu_listing),
+    ("the_hindu", "article", baseline_the_hindu_article),
+    ("boom_live", "listing", baseline_boom_live_listing),
+    ("boom_live", "article", baseline_boom_live_article),
+    ("natural_news", "listing", baseline_natural_news_listing),
+    ("fauxy", "listing", baseline_fauxy_listing),
+    ("fauxy", "article", baseline_fauxy_article),
+]
+
+
+# Function to measure the mean time per document and the peak memory
+def measure(function, html_content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(html_content)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    function(html_content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"parser: {extraction.PARSER}")
+    print(
+        f"{'fixture':<24}{'baseline ms':>12}{'new ms':>10}{'speedup':>9}"
+        f"{'baseline KiB':>14}{'new KiB':>10}"
+    )
+    for source, kind, baseline in CASES:
+        html_content = load_fixture(f"{source}_{kind}")
+        if kind == "listing":
+            extract = lambda html: extraction.extract_listing(source, html)
+        else:
+            extract = lambda html: extraction.extract_article(source, html)
+
+        assert baseline(html_content) == extract(html_content), source + kind
+
+        baseline_time, baseline_peak = measure(baseline, html_content, args.repeat)
+        new_time, new_peak = measure(extract, html_content, args.repeat)
+        print(
+            f"{source + '_' + kind:<24}{baseline_time * 1000:>12.2f}"
+            f"{new_time * 1000:>10.2f}{baseline_time / new_time:>8.1f}x"
+            f"{baseline_peak / 1024:>14.0f}{new_peak / 1024:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
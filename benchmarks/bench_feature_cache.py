@@ -0,0 +1,136 @@
+# Benchmark of the feature cache used by training.py.
+# Vectorizes a synthetic corpus with the training featurizer through
+# feature_cache, first cold and then from the cache, and runs the
+# incremental mode (training.py --incremental-features) over the corpus
+# before and after newly scraped rows are added. Checks that a warm load
+# gives the cold features, that only the new rows are transformed, with
+# the vocabulary left as it was, and that their features are the ones a
+# fresh transform gives:
+#
+#     python -m benchmarks.bench_feature_cache --documents 20000 --new 2000
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+
+import feature_cache
+import training
+from benchmarks import synthetic_corpus
+
+
+# Function to run `function`, counting the rows the featurizers transform
+# meanwhile (fitting is not counted). Returns its result and the count.
+def transformed_rows(function, *args, **kwargs):
+    counted = []
+    original = Pipeline.transform
+
+    def transform(self, texts, *transform_args, **transform_kwargs):
+        counted.append(len(texts))
+        return original(self, texts, *transform_args, **transform_kwargs)
+
+    Pipeline.transform = transform
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        Pipeline.transform = original
+    return result, sum(counted)
+
+
+# Function to run `function` and time it
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# Function to check whether two sparse matrices hold the same values, up to
+# the rounding that differs between batches of one transform
+def same_matrix(first, second):
+    return first.shape == second.shape and abs(first - second).max() <= 1e-12
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=20_000)
+    parser.add_argument("--new", type=int, default=2_000, help="rows scraped later")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = synthetic_corpus.generate(args.documents + args.new, args.seed)
+    texts, labels = list(data["Content"]), data["Label"].to_numpy()
+    old_texts, old_labels = texts[: args.documents], labels[: args.documents]
+    cache_dir = tempfile.mkdtemp(prefix="bench_feature_cache_")
+    try:
+        split = (training.TEST_SIZE, training.SEED)
+        cold, cold_seconds = timed(
+            feature_cache.split_features,
+            old_texts,
+            old_labels,
+            training.build_featurizer(),
+            *split,
+            cache_dir=cache_dir,
+        )
+        warm, warm_seconds = timed(
+            feature_cache.split_features,
+            old_texts,
+            old_labels,
+            training.build_featurizer(),
+            *split,
+            cache_dir=cache_dir,
+        )
+        assert same_matrix(cold[1], warm[1]) and same_matrix(cold[2], warm[2])
+
+        test_percent = round(training.TEST_SIZE * 100)
+        first, first_seconds = timed(
+            feature_cache.incremental_features,
+            old_texts,
+            old_labels,
+            training.build_featurizer(),
+            test_percent,
+            cache_dir,
+        )
+        (grown, rows), grown_seconds = timed(
+            transformed_rows,
+            feature_cache.incremental_features,
+            texts,
+            labels,
+            training.build_featurizer(),
+            test_percent,
+            cache_dir,
+        )
+        assert rows == args.new, f"transformed {rows} rows, {args.new} are new"
+        vocabulary = feature_cache._vectorizer(first[0]).vocabulary_
+        assert feature_cache._vectorizer(grown[0]).vocabulary_ == vocabulary
+        test = feature_cache.is_test(texts, test_percent)
+        for matrix, mask in ((grown[1], ~test), (grown[2], test)):
+            fresh = first[0].transform(
+                [text for text, keep in zip(texts, mask) if keep]
+            )
+            assert same_matrix(matrix, fresh), "incremental features changed"
+        assert np.array_equal(grown[3], labels[~test])
+        (_, rows), rerun_seconds = timed(
+            transformed_rows,
+            feature_cache.incremental_features,
+            texts,
+            labels,
+            training.build_featurizer(),
+            test_percent,
+            cache_dir,
+        )
+        assert rows == 0, f"transformed {rows} rows of an unchanged corpus"
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"documents: {args.documents}, new: {args.new}")
+    print(f"split, cold:          {cold_seconds:8.2f}s")
+    print(f"split, cached:        {warm_seconds:8.2f}s")
+    print(f"incremental, first:   {first_seconds:8.2f}s")
+    print(f"incremental, +{args.new:<7}{grown_seconds:8.2f}s")
+    print(f"incremental, rerun:   {rerun_seconds:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
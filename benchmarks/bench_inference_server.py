@@ -0,0 +1,121 @@
+# Load-generator benchmark of the micro-batching inference server.
+# Trains small models on a synthetic corpus into a temporary directory,
+# serves them locally and fires single-article requests from concurrent
+# clients, once with batching disabled and once with micro-batching:
+#
+#     python -m benchmarks.bench_inference_server --clients 32 --requests 200
+import argparse
+import http.client
+import json
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import model_store
+import predict
+import training
+from benchmarks import synthetic_corpus
+from inference_server import InferenceServer, MicroBatcher
+
+
+# Function to train and persist models into `directory`
+def train_models(directory, documents):
+    featurizer, models, _ = training.train(
+        synthetic_corpus.generate(documents), feature_cache_dir=None
+    )
+    model_store.save(featurizer, models, {}, directory=directory)
+
+
+# Function to send `count` requests over one keep-alive connection,
+# appending the latency of each to `latencies`
+def run_client(base_url, texts, count, latencies):
+    host, port = base_url.split("//")[1].split(":")
+    connection = http.client.HTTPConnection(host, int(port))
+    for number in range(count):
+        body = json.dumps({"text": texts[number % len(texts)]})
+        start = time.perf_counter()
+        connection.request(
+            "POST", "/predict", body, {"Content-Type": "application/json"}
+        )
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        assert response.status == 200, response.status
+    connection.close()
+
+
+# Function to load one server configuration with concurrent clients
+def load_test(predictor, max_batch, max_wait, clients, requests, texts):
+    batcher = MicroBatcher(predictor, max_batch, max_wait)
+    server = InferenceServer(batcher, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    latencies = []
+    workers = [
+        threading.Thread(
+            target=run_client, args=(server.base_url, texts, requests, latencies)
+        )
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    metrics = batcher.metrics.snapshot(batcher.queue_depth())
+    server.shutdown()
+    server.server_close()
+    thread.join()
+    batcher.close()
+    latencies = np.array(latencies) * 1000
+    return {
+        "docs_per_second": len(latencies) / elapsed,
+        "p50_ms": np.percentile(latencies, 50),
+        "p99_ms": np.percentile(latencies, 99),
+        "mean_batch_size": metrics["mean_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="per client")
+    parser.add_argument("--documents", type=int, default=4000, help="training size")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        train_models(directory, args.documents)
+        predictor = predict.Predictor(directory=directory)
+        texts = synthetic_corpus.generate(500, seed=1)["Content"].tolist()
+
+        print(
+            f"{'configuration':<26}{'docs/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+            f"{'batch':>8}"
+        )
+        for name, max_batch, max_wait in [
+            ("unbatched", 1, 0),
+            (
+                f"micro-batched ({args.max_wait_ms:g} ms)",
+                args.max_batch,
+                args.max_wait_ms / 1000,
+            ),
+        ]:
+            result = load_test(
+                predictor, max_batch, max_wait, args.clients, args.requests, texts
+            )
+            print(
+                f"{name:<26}{result['docs_per_second']:>9.0f}"
+                f"{result['p50_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                f"{result['mean_batch_size']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Scaling benchmark of the multi-process parse pool.
+# Parses and cleans the saved article and listing fixtures, repeated to
+# `--pages` pages, inline on one thread and then through parse pools of
+# 1..N processes, checks every configuration gives the same records, and
+# reports pages per second and the speedup over inline parsing:
+#
+#     python -m benchmarks.bench_parse_pool --pages 2000 --max-processes 8
+import argparse
+import os
+import time
+
+import crawler
+import extraction
+import parse_pool
+import text_normalizer
+from benchmarks.stub_server import SITES, load_fixture
+
+
+# Function to list the (function, args) parse jobs of `pages` fixture pages
+def build_jobs(pages):
+    kinds = []
+    for site in SITES:
+        try:
+            kinds.append(("article", site, load_fixture(f"{site}_article")))
+        except FileNotFoundError:
+            kinds.append(("listing", site, load_fixture(f"{site}_listing")))
+    jobs = []
+    for number in range(pages):
+        kind, site, html_content = kinds[number % len(kinds)]
+        if kind == "article":
+            jobs.append(
+                (
+                    crawler.process_article,
+                    (
+                        site,
+                        html_content,
+                        f"Headline {number}",
+                        text_normalizer.clean_text,
+                    ),
+                )
+            )
+        else:
+            jobs.append((extraction.extract_listing, (site, html_content)))
+    return jobs
+
+
+# Function to parse every job through the shared pool, returning the
+# elapsed seconds and the results without their timings
+def run_jobs(jobs):
+    start = time.perf_counter()
+    futures = [parse_pool.submit(function, *args) for function, args in jobs]
+    results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    return elapsed, [
+        result[:2] if isinstance(result, tuple) else result for result in results
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    jobs = build_jobs(args.pages)
+    print(f"parser: {extraction.PARSER}, pages: {len(jobs)}, cores: {os.cpu_count()}")
+    print(f"{'configuration':<16}{'seconds':>9}{'pages/s':>10}{'speedup':>9}")
+
+    parse_pool.configure(0)
+    inline_time, expected = run_jobs(jobs)
+    print(
+        f"{'inline':<16}{inline_time:>9.2f}{len(jobs) / inline_time:>10.0f}{1:>8.1f}x"
+    )
+
+    for processes in range(1, args.max_processes + 1):
+        parse_pool.configure(processes)
+        elapsed, results = run_jobs(jobs)
+        assert results == expected, f"{processes} processes changed the records"
+        print(
+            f"{f'{processes} processes':<16}{elapsed:>9.2f}"
+            f"{len(jobs) / elapsed:>10.0f}{inline_time / elapsed:>8.1f}x"
+        )
+    parse_pool.configure(0)
+
+
+if __name__ == "__main__":
+    main()
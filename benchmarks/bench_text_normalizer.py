@@ -0,0 +1,146 @@
+# Micro-benchmark of text_normalizer against the original cleaning rules.
+# Runs the original clean_and_preprocess (both scrapers) and the notebook's
+# wordopt next to their text_normalizer replacements over a synthetic
+# corpus, checks every output is identical and reports the cost per
+# document:
+#
+#     python -m benchmarks.bench_text_normalizer --documents 20000
+import argparse
+import random
+import re
+import string
+import time
+
+import text_normalizer
+
+
+# Original clean_and_preprocess of news_true_scrapping.py
+def baseline_clean_true(text):
+    text = text.strip()
+    text = re.sub(r"&amp;", "&", text)
+    text = re.sub(r"&lt;", "<", text)
+    text = re.sub(r"&gt;", ">", text)
+    text = re.sub(r"&quot;", '"', text)
+    text = re.sub(r"&#039;", "'", text)
+    text = re.sub(r"\s+", " ", text)
+    return text
+
+
+# Original clean_and_preprocess of news_fake_scrapping.py
+def baseline_clean_fake(text):
+    text = text.strip()
+    text = re.sub(r"’", "'", text)
+    text = re.sub(r"‘", "'", text)
+    text = re.sub(r"“", '"', text)
+    text = re.sub(r"”", '"', text)
+    text = re.sub(r"–", "-", text)
+    text = re.sub(r"—", "-", text)
+    text = re.sub(r"&amp;", "&", text)
+    text = re.sub(r"&lt;", "<", text)
+    text = re.sub(r"&gt;", ">", text)
+    text = re.sub(r"&quot;", '"', text)
+    text = re.sub(r"&#039;", "'", text)
+    text = re.sub(r"\s+", " ", text)
+    return text
+
+
+# Original wordopt of the notebook
+def baseline_wordopt(Content):
+    Content = re.sub(r"\d", "", Content)
+    Content = Content.lower()
+    Content = re.sub(r"\[.*?\]", "", Content)
+    Content = re.sub("\\W", " ", Content)
+    Content = re.sub(r"https?://\S+|www\.\S+", "", Content)
+    Content = re.sub("<.*?>+", "", Content)
+    Content = re.sub("[%s]" % re.escape(string.punctuation), "", Content)
+    Content = re.sub("\n", "", Content)
+    Content = re.sub(r"\w*\d\w*", "", Content)
+    return Content
+
+
+# Tokens covering every rule: entities (also double-escaped), typographic
+# punctuation, digits, brackets, URLs, tags, underscores and odd whitespace
+TOKENS = (
+    "government minister court police election report state city market "
+    "said on monday the of a to in and"
+).split() + [
+    "&amp;",
+    "&amp;lt;",
+    "&amp;amp;",
+    "&lt;b&gt;",
+    "&quot;quoted&quot;",
+    "it&#039;s",
+    "‘single’",
+    "“double”",
+    "2013–2014",
+    "—",
+    "Rs.1,200",
+    "[citation needed]",
+    "[1]",
+    "https://www.example.com/path?q=1",
+    "www.example.org",
+    "<p>",
+    "snake_case",
+    "COVID-19",
+    "\t",
+    "\n",
+    "  ",
+    " ",
+    "Ä°stanbul",
+]
+
+
+# Function to generate a reproducible synthetic corpus
+def make_corpus(documents, words=120, seed=0):
+    rng = random.Random(seed)
+    return [
+        "  " + " ".join(rng.choice(TOKENS) for _ in range(words)) + " \n"
+        for _ in range(documents)
+    ]
+
+
+# Function to time a function over the corpus, returning its outputs
+def timed(function, corpus):
+    start = time.perf_counter()
+    outputs = function(corpus)
+    return time.perf_counter() - start, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=20000)
+    args = parser.parse_args()
+    corpus = make_corpus(args.documents)
+
+    cases = [
+        (
+            "clean (true)",
+            lambda texts: [baseline_clean_true(text) for text in texts],
+            lambda texts: text_normalizer.clean_batch(texts, typographic=False),
+        ),
+        (
+            "clean (fake)",
+            lambda texts: [baseline_clean_fake(text) for text in texts],
+            text_normalizer.clean_batch,
+        ),
+        (
+            "wordopt",
+            lambda texts: [baseline_wordopt(text) for text in texts],
+            text_normalizer.wordopt_batch,
+        ),
+    ]
+
+    print(f"{'rule set':<16}{'baseline us/doc':>17}{'new us/doc':>12}{'speedup':>9}")
+    for name, baseline, normalizer in cases:
+        baseline_time, expected = timed(baseline, corpus)
+        new_time, actual = timed(normalizer, corpus)
+        assert expected == actual, f"{name} output differs"
+        print(
+            f"{name:<16}{baseline_time / len(corpus) * 1e6:>17.1f}"
+            f"{new_time / len(corpus) * 1e6:>12.1f}"
+            f"{baseline_time / new_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Diff of two benchmark suite reports.
+# Prints every stage's time and memory high-water mark side by side and
+# exits with status 1 when a stage got slower (or used more memory) by
+# more than --threshold, so it can gate a change:
+#
+#     python -m benchmarks.compare_reports before.json after.json
+import argparse
+import json
+import sys
+
+# Relative change above which a stage counts as a regression
+THRESHOLD = 0.10
+
+
+# Function to compare one measurement, returning the relative change
+def change(before, after):
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before
+
+
+# Function to compare two reports, returning one row per stage and the
+# names of the stages that regressed
+def compare(before, after, threshold=THRESHOLD):
+    rows = []
+    regressions = []
+    for stage in list(before["stages"]) + [
+        stage for stage in after["stages"] if stage not in before["stages"]
+    ]:
+        old = before["stages"].get(stage, {})
+        new = after["stages"].get(stage, {})
+        time_change = change(old.get("seconds"), new.get("seconds"))
+        memory_change = change(old.get("peak_mb"), new.get("peak_mb"))
+        regressed = any(
+            value is not None and value > threshold
+            for value in (time_change, memory_change)
+        )
+        if regressed:
+            regressions.append(stage)
+        rows.append((stage, old, new, time_change, memory_change, regressed))
+    return rows, regressions
+
+
+# Function to format a value that may be missing from one of the reports
+def formatted(value, spec):
+    return format(value, spec) if value is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as before_file:
+        before = json.load(before_file)
+    with open(args.after, encoding="utf-8") as after_file:
+        after = json.load(after_file)
+
+    for report, name in ((before, args.before), (after, args.after)):
+        environment = report["environment"]
+        print(
+            f"{name}: {environment['rows']} rows, seed {environment['seed']},"
+            f" commit {(environment['git_commit'] or '?')[:10]}"
+        )
+    if before["environment"]["rows"] != after["environment"]["rows"]:
+        print("warning: the reports were run on different corpus sizes")
+
+    rows, regressions = compare(before, after, args.threshold)
+    print(
+        f"\n{'stage':<18}{'before s':>10}{'after s':>10}{'change':>9}"
+        f"{'before MB':>11}{'after MB':>10}{'change':>9}"
+    )
+    for stage, old, new, time_change, memory_change, regressed in rows:
+        print(
+            f"{stage:<18}{formatted(old.get('seconds'), '10.3f'):>10}"
+            f"{formatted(new.get('seconds'), '10.3f'):>10}"
+            f"{formatted(time_change, '+9.1%'):>9}"
+            f"{formatted(old.get('peak_mb'), '11.1f'):>11}"
+            f"{formatted(new.get('peak_mb'), '10.1f'):>10}"
+            f"{formatted(memory_change, '+9.1%'):>9}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# Reproducible benchmark suite of the whole pipeline.
+# Times every stage, from crawling the saved HTML fixtures and extracting
+# fields through cleaning, wordopt, TF-IDF vectorization, and fitting and
+# predicting with LR/DT/RF, on a synthetic corpus of a fixed size and
+# seed. Each stage is timed (best of --repeat runs) and then run once more
+# under tracemalloc for its memory high-water mark. The JSON report can be
+# diffed between runs with benchmarks.compare_reports:
+#
+#     python -m benchmarks.run_suite --size 10k --output report.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from importlib import metadata
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import train_test_split
+
+import crawl_frontier
+import crawler
+import dedup_index
+import extraction
+import html_archive
+import http_cache
+import http_client
+import text_normalizer
+import training
+from benchmarks import synthetic_corpus
+from benchmarks.stub_server import (
+    FIXTURES_DIR,
+    SITES,
+    load_fixture,
+    serve,
+    stub_sources,
+)
+
+# Times every fixture page is parsed in the extraction stage
+EXTRACT_ROUNDS = 20
+
+PACKAGES = ["pandas", "numpy", "scipy", "scikit-learn", "beautifulsoup4", "lxml"]
+
+
+# Function to crawl every source once from a zero-latency stub server
+def stage_crawl(context):
+    http_cache.configure(enabled=False)
+    http_client.configure(rate_limit=False)
+    crawl_frontier.configure(enabled=False)
+    dedup_index.configure(enabled=False)
+    html_archive.configure(enabled=False)
+    with serve(latency=0) as server:
+        dataframe = crawler.crawl(
+            text_normalizer.clean_text, sources=stub_sources(server.base_url)
+        )
+    return len(dataframe)
+
+
+# Function to extract the fields of every saved fixture page
+def stage_extract(context):
+    pages = 0
+    for _ in range(EXTRACT_ROUNDS):
+        for site in SITES:
+            extraction.extract_listing(site, context["fixtures"][f"{site}_listing"])
+            pages += 1
+            article = context["fixtures"].get(f"{site}_article")
+            if article is not None:
+                extraction.extract_article(site, article)
+                pages += 1
+    return pages
+
+
+def stage_clean(context):
+    text_normalizer.clean_batch(context["corpus"]["Content"])
+    return len(context["corpus"])
+
+
+def stage_wordopt(context):
+    context["normalized"] = text_normalizer.wordopt_batch(context["corpus"]["Content"])
+    return len(context["normalized"])
+
+
+# Function to split the normalized corpus the way the notebook does
+def split(context):
+    if "x_train" not in context:
+        (
+            context["x_train"],
+            context["x_test"],
+            context["y_train"],
+            context["y_test"],
+        ) = train_test_split(
+            context["normalized"],
+            context["corpus"]["Label"],
+            test_size=training.TEST_SIZE,
+            random_state=context["seed"],
+        )
+
+
+def stage_tfidf_fit(context):
+    split(context)
+    context["vectorizer"] = TfidfVectorizer(
+        max_features=training.MAX_FEATURES, ngram_range=training.NGRAM_RANGE
+    )
+    context["train_features"] = context["vectorizer"].fit_transform(context["x_train"])
+    return len(context["x_train"])
+
+
+def stage_tfidf_transform(context):
+    context["test_features"] = context["vectorizer"].transform(context["x_test"])
+    return len(context["x_test"])
+
+
+# Function to build the fit and predict stages of one classifier
+def model_stages(name):
+    def fit(context):
+        context[name] = training.MODELS[name]().fit(
+            context["train_features"], context["y_train"]
+        )
+        return context["train_features"].shape[0]
+
+    def predict(context):
+        context[name].predict(context["test_features"])
+        return context["test_features"].shape[0]
+
+    return [(f"fit_{name}", fit), (f"predict_{name}", predict)]
+
+
+# Function to list the stages in the order they run
+def build_stages(models):
+    stages = [
+        ("crawl", stage_crawl),
+        ("extract", stage_extract),
+        ("clean", stage_clean),
+        ("wordopt", stage_wordopt),
+        ("tfidf_fit", stage_tfidf_fit),
+        ("tfidf_transform", stage_tfidf_transform),
+    ]
+    for name in models:
+        stages += model_stages(name)
+    return stages
+
+
+# Function to time a stage, best of `repeat` runs, then measure its peak
+# traced memory in one more run
+def run_stage(function, context, repeat=1, memory=True):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = function(context)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    result = {
+        "seconds": best,
+        "items": items,
+        "items_per_second": items / best if best else None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            function(context)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_mb"] = peak / 2**20
+    return result
+
+
+# Function to describe the environment a report was produced in
+def environment(rows, seed):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rows": rows,
+        "seed": seed,
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "packages": packages,
+    }
+
+
+# Function to run the suite and return its report
+def run_suite(rows, seed=0, models=None, repeat=1, memory=True, stages=None):
+    context = {
+        "seed": seed,
+        "corpus": synthetic_corpus.generate(rows, seed),
+        "fixtures": {
+            name: load_fixture(name)
+            for site in SITES
+            for name in (f"{site}_listing", f"{site}_article")
+            if os.path.isfile(os.path.join(FIXTURES_DIR, f"{name}.html"))
+        },
+    }
+    report = {"environment": environment(rows, seed), "stages": {}}
+    for name, function in build_stages(models or list(training.MODELS)):
+        if stages and name not in stages:
+            continue
+        result = run_stage(function, context, repeat, memory)
+        report["stages"][name] = result
+        peak = f"{result['peak_mb']:>9.1f} MB" if memory else ""
+        print(f"{name:<18}{result['seconds']:>9.3f}s{peak}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=list(synthetic_corpus.SIZES), default="10k")
+    parser.add_argument("--rows", type=int, help="overrides --size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--model",
+        action="append",
+        choices=list(training.MODELS),
+        help="only benchmark this classifier (repeatable)",
+    )
+    parser.add_argument(
+        "--stage",
+        action="append",
+        help="only report this stage (repeatable); the stages it depends on"
+        " must be listed too",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the tracemalloc runs"
+    )
+    parser.add_argument("--output", default="benchmark_report.json")
+    args = parser.parse_args()
+
+    rows = args.rows or synthetic_corpus.SIZES[args.size]
+    report = run_suite(
+        rows,
+        seed=args.seed,
+        models=args.model,
+        repeat=args.repeat,
+        memory=not args.no_memory,
+        stages=args.stage,
+    )
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
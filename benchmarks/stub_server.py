@@ -0,0 +1,120 @@
+import copy
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sources import SOURCES
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Sites that have canned pages in the fixtures directory
+SITES = ["the_hindu", "boom_live", "natural_news", "fauxy"]
+
+
+# Function to load a saved HTML fixture as bytes
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.html"), "rb") as fixture:
+        return fixture.read()
+
+
+# Function to pick the canned page for a request path.
+# The first path segment names the site; any path containing "/article/"
+# is served the site's article page, everything else its listing page.
+# Listing pages link their articles as "article/<n>" relative links.
+def route(path):
+    site = path.strip("/").split("/")[0]
+    if site not in SITES:
+        return None
+    kind = "article" if "/article/" in path else "listing"
+    name = f"{site}_{kind}"
+    if not os.path.isfile(os.path.join(FIXTURES_DIR, f"{name}.html")):
+        return None
+    return name
+
+
+# Function to point every source of the registry at the stub server.
+# Each source keeps its first section only, crawled over `max_pages` pages.
+def stub_sources(base_url, max_pages=3):
+    sources = copy.deepcopy(SOURCES)
+    for name, source in sources.items():
+        section = source["sections"][0]
+        section["url"] = f"{base_url}/{name}/{section['category'].lower()}/"
+        if "page_url" in source:
+            section["max_pages"] = max_pages
+        source["sections"] = [section]
+    return sources
+
+
+# Local HTTP server that serves the fixtures with an artificial delay per
+# request, standing in for the network round trip to the real sites
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.pages = {
+            f"{site}_{kind}": load_fixture(f"{site}_{kind}")
+            for site in SITES
+            for kind in ("listing", "article")
+            if os.path.isfile(os.path.join(FIXTURES_DIR, f"{site}_{kind}.html"))
+        }
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one write so keep-alive clients are not held
+    # up by delayed ACKs between the two
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        with self.server._count_lock:
+            self.server.request_count += 1
+        time.sleep(self.server.latency)
+
+        name = route(self.path)
+        if name is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = self.server.pages[name]
+        if name.endswith("_listing"):
+            # Give every listing page its own article links, as on the real
+            # sites, instead of repeating the same articles on each page
+            page_key = zlib.crc32(self.path.encode("utf-8"))
+            body = body.replace(b"article/", f"article/{page_key}-".encode())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Context manager that runs a stub server on a background thread
+@contextmanager
+def serve(latency=0.05):
+    server = StubServer(latency)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
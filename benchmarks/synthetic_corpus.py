@@ -0,0 +1,153 @@
+# Generator of synthetic labelled news corpora for the benchmarks.
+# Articles are drawn from a fixed random vocabulary with Zipf-distributed
+# word frequencies; fake and true articles rank the vocabulary differently,
+# so the classifiers have something to learn, and a share of the tokens
+# carries the entities, typographic punctuation, digits and brackets the
+# cleaning rules deal with. The same seed always gives the same corpus:
+#
+#     python -m benchmarks.synthetic_corpus --size 100k --output-dir /tmp/corpus
+import argparse
+import os
+import string
+
+import numpy as np
+import pandas as pd
+
+# Preset corpus sizes
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+VOCABULARY_SIZE = 50_000
+WORDS_PER_ARTICLE = 150
+WORDS_PER_HEADLINE = 10
+
+# Share of tokens replaced by noise the cleaning rules must handle
+NOISE_RATE = 0.03
+NOISE_TOKENS = [
+    "&amp;",
+    "&amp;lt;",
+    "&quot;quoted&quot;",
+    "it&#039;s",
+    "‘single’",
+    "“double”",
+    "2013–2014",
+    "—",
+    "Rs.1,200",
+    "[citation needed]",
+    "https://www.example.com/path?q=1",
+    "<p>",
+    "snake_case",
+    "COVID-19",
+    "\t",
+]
+
+CATEGORIES = ["India", "World", "Science", "Technology", "Business", "Sports"]
+
+CHUNK_SIZE = 10_000
+
+# Typographic punctuation outside ISO-8859-1, replaced in the true dataset
+_LATIN1 = str.maketrans(
+    {
+        "\u2018": "'",
+        "\u2019": "'",
+        "\u201c": '"',
+        "\u201d": '"',
+        "\u2013": "-",
+        "\u2014": "-",
+    }
+)
+
+
+# Function to build the shared vocabulary and each class's word ranking
+def _vocabulary(seed):
+    rng = np.random.default_rng(seed)
+    letters = np.array(list(string.ascii_lowercase))
+    lengths = rng.integers(3, 10, VOCABULARY_SIZE)
+    vocabulary = np.array(
+        ["".join(rng.choice(letters, length)) for length in lengths], dtype=object
+    )
+    rankings = [rng.permutation(VOCABULARY_SIZE) for _ in range(2)]
+    return vocabulary, rankings
+
+
+# Function to draw `count` texts of `words` tokens for one label
+def _texts(rng, vocabulary, ranking, count, words):
+    ranks = np.minimum(rng.zipf(1.3, size=(count, words)) - 1, VOCABULARY_SIZE - 1)
+    tokens = vocabulary[ranking[ranks]]
+    noise = rng.random((count, words)) < NOISE_RATE
+    tokens[noise] = rng.choice(np.array(NOISE_TOKENS, dtype=object), noise.sum())
+    return [" ".join(row) for row in tokens]
+
+
+# Function to generate a corpus of `rows` articles in chunks of DataFrames
+# with the scraped datasets' columns, alternating fake (0) and true (1)
+def iter_chunks(rows, seed=0, chunk_size=CHUNK_SIZE):
+    vocabulary, rankings = _vocabulary(seed)
+    rng = np.random.default_rng(seed + 1)
+    dates = pd.date_range("2024-01-01", "2024-12-31").strftime("%Y-%m-%d")
+    for start in range(0, rows, chunk_size):
+        count = min(chunk_size, rows - start)
+        labels = (np.arange(start, start + count) % 2).astype(int)
+        headlines = np.empty(count, dtype=object)
+        contents = np.empty(count, dtype=object)
+        for label in (0, 1):
+            mask = labels == label
+            headlines[mask] = _texts(
+                rng, vocabulary, rankings[label], mask.sum(), WORDS_PER_HEADLINE
+            )
+            contents[mask] = _texts(
+                rng, vocabulary, rankings[label], mask.sum(), WORDS_PER_ARTICLE
+            )
+        yield pd.DataFrame(
+            {
+                "Category": rng.choice(CATEGORIES, count),
+                "Headline": headlines,
+                "Content": contents,
+                "Published Date": rng.choice(dates, count),
+                "Label": labels,
+            }
+        )
+
+
+# Function to generate a whole corpus as one DataFrame
+def generate(rows, seed=0):
+    return pd.concat(list(iter_chunks(rows, seed)), ignore_index=True)
+
+
+# Function to write a corpus as the two CSVs the notebook and training.py
+# read, returning their paths
+def write_csvs(rows, directory, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        0: (os.path.join(directory, "news_fake_scrapped_data.csv"), "utf-8"),
+        1: (os.path.join(directory, "news_true_scrapped_data.csv"), "ISO-8859-1"),
+    }
+    first = True
+    for chunk in iter_chunks(rows, seed):
+        for label, (path, encoding) in paths.items():
+            part = chunk[chunk["Label"] == label]
+            if label == 1:
+                # The notebook reads the true dataset as ISO-8859-1
+                part = part.assign(
+                    Headline=part["Headline"].str.translate(_LATIN1),
+                    Content=part["Content"].str.translate(_LATIN1),
+                )
+            part.to_csv(
+                path,
+                mode="w" if first else "a",
+                header=first,
+                index=False,
+                encoding=encoding,
+            )
+        first = False
+    return [path for path, _ in paths.values()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic news corpus")
+    parser.add_argument("--size", choices=list(SIZES), default="10k")
+    parser.add_argument("--rows", type=int, help="overrides --size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+    for path in write_csvs(args.rows or SIZES[args.size], args.output_dir, args.seed):
+        print(f"Wrote {path}")
@@ -0,0 +1,253 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import date_parser
+import text_normalizer
+
+# Text columns are Arrow-backed when pyarrow is installed: one contiguous
+# UTF-8 buffer per column instead of a Python object per row, and cached
+# corpora are uncompressed Arrow IPC files, memory-mapped when loaded.
+# Without it the text stays in object columns and the cache is a pickle.
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.ipc
+
+    TEXT_DTYPE = "string[pyarrow]"
+    CACHE_FORMAT = "arrow"
+except ImportError:
+    pyarrow = None
+    TEXT_DTYPE = object
+    CACHE_FORMAT = "pkl"
+
+# Scraped datasets the notebook trains on, with the encodings it reads them
+# with. Files starting with a UTF-8 byte order mark, as the scrapers write
+# them, are read as UTF-8 whatever their default (see file_encoding).
+FAKE_CSV = "news_fake_scrapped_data.csv"
+TRUE_CSV = "news_true_scrapped_data.csv"
+FAKE_ENCODING = "utf-8"
+TRUE_ENCODING = "ISO-8859-1"
+
+# Columns of the loaded corpus: the models only need Content and Label,
+# Category is kept for analysis as it costs one byte per row
+COLUMNS = ["Category", "Content", "Label"]
+
+# Label 0 is fake news, 1 true news
+LABEL_DTYPE = pd.CategoricalDtype([0, 1])
+
+# Directory holding the cached corpora, one file per distinct input
+CACHE_DIR = ".corpus_cache"
+
+# Bumped whenever the cached corpus changes shape or meaning
+CACHE_VERSION = 1
+
+# Rows parsed at a time, so the Python strings of a whole file never have
+# to be held at once
+CHUNK_ROWS = 10_000
+
+BOM = b"\xef\xbb\xbf"
+
+
+# Function to hash a file so a version records exactly what it was trained on
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as data:
+        for block in iter(lambda: data.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Function to pick the encoding of a scraped CSV: UTF-8 when it starts with
+# a byte order mark, `default` otherwise
+def file_encoding(path, default):
+    with open(path, "rb") as data:
+        return "utf-8-sig" if data.read(len(BOM)) == BOM else default
+
+
+# Function to convert a parsed chunk to the loader's column types
+def _typed(chunk, normalized):
+    for column in ("Headline", "Content"):
+        if column in chunk:
+            texts = chunk[column].fillna("").astype(str)
+            if normalized and column == "Content":
+                texts = text_normalizer.wordopt_batch(texts)
+            chunk[column] = texts.astype(TEXT_DTYPE)
+    if "Category" in chunk:
+        chunk["Category"] = chunk["Category"].fillna("").astype("category")
+    if "Published Date" in chunk:
+        # Older CSVs hold dates in the formats of earlier versions
+        chunk["Published Date"] = date_parser.normalize_column(
+            chunk["Published Date"], typed=True
+        )
+    if "Label" in chunk:
+        chunk["Label"] = chunk["Label"].astype(int).astype(LABEL_DTYPE)
+    return chunk
+
+
+# Function to concatenate typed chunks, merging the categories of the
+# Category columns instead of falling back to objects
+def _concat(chunks):
+    frame = pd.concat(chunks, ignore_index=True)
+    if chunks and "Category" in frame:
+        frame["Category"] = pd.api.types.union_categoricals(
+            [chunk["Category"] for chunk in chunks]
+        )
+    return frame
+
+
+# Function to read a scraped CSV with typed columns, only parsing `columns`
+# (all of them when None). With `normalized` the content is run through
+# wordopt as it is read.
+def read_dataset(path, encoding, columns=COLUMNS, normalized=False):
+    reader = pd.read_csv(
+        path,
+        usecols=columns,
+        encoding=file_encoding(path, encoding),
+        dtype=object,
+        chunksize=CHUNK_ROWS,
+    )
+    with reader:
+        return _concat([_typed(chunk, normalized) for chunk in reader])
+
+
+# Function to build the cache key of a corpus from the digests of its
+# files, the encodings they are read with and the normalization applied
+def cache_key(paths, normalized=False):
+    description = {
+        "version": CACHE_VERSION,
+        "format": CACHE_FORMAT,
+        "text_dtype": str(TEXT_DTYPE),
+        "files": [
+            [file_digest(path), file_encoding(path, encoding)]
+            for path, encoding in paths
+        ],
+        "columns": COLUMNS,
+        "normalizer_version": (
+            text_normalizer.NORMALIZER_VERSION if normalized else None
+        ),
+    }
+    encoded = json.dumps(description, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+# Function to write a corpus to the cache, returning it as it was stored.
+# Arrow files hold every column in one contiguous chunk, so shuffling a
+# loaded corpus never has to concatenate chunks first.
+def _write_cache(frame, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    if CACHE_FORMAT == "arrow":
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        del frame
+        table = table.combine_chunks()
+        pyarrow.feather.write_feather(
+            table,
+            temporary_path,
+            compression="uncompressed",
+            chunksize=max(table.num_rows, 1),
+        )
+        frame = _from_arrow(table)
+    else:
+        frame.to_pickle(temporary_path)
+    os.replace(temporary_path, path)
+    return frame
+
+
+# Function to read a cached corpus back. Arrow files are memory-mapped, so
+# the text is not copied in memory until the rows are reordered.
+def _read_cache(path):
+    if CACHE_FORMAT != "arrow":
+        return pd.read_pickle(path)
+    with pyarrow.memory_map(path) as source:
+        return _from_arrow(pyarrow.ipc.open_file(source).read_all())
+
+
+# Function to convert an Arrow table to a frame with the loader's column
+# types, which Arrow files do not keep for text and integer categories
+def _from_arrow(table):
+    text_types = {
+        pyarrow.string(): pd.StringDtype("pyarrow"),
+        pyarrow.large_string(): pd.StringDtype("pyarrow"),
+    }
+    frame = table.to_pandas(types_mapper=text_types.get)
+    frame["Label"] = frame["Label"].astype(LABEL_DTYPE)
+    return frame
+
+
+# Function to shuffle the rows of a frame, always in the same order for a
+# given seed, and number them again
+def _shuffled(frame, seed=None):
+    permutation = np.random.default_rng(seed).permutation(len(frame))
+    return frame.take(permutation).reset_index(drop=True)
+
+
+# Function to load the merged Category/Content/Label corpus of both
+# datasets, fake news first. With `normalized` the content is already run
+# through wordopt; with `shuffle` the rows are shuffled (reproducibly when
+# `seed` is given) and renumbered. The typed corpus is cached under
+# `cache_dir` by the digests of the raw files, so it is only parsed again
+# once a file, its encoding or the normalizer changes; None disables the
+# cache.
+def load_corpus(
+    fake_path=FAKE_CSV,
+    true_path=TRUE_CSV,
+    normalized=False,
+    shuffle=False,
+    seed=None,
+    cache_dir=CACHE_DIR,
+):
+    paths = [(fake_path, FAKE_ENCODING), (true_path, TRUE_ENCODING)]
+    cache_path = None
+    if cache_dir is not None:
+        key = cache_key(paths, normalized)
+        cache_path = os.path.join(cache_dir, f"{key}.{CACHE_FORMAT}")
+
+    if cache_path is not None and os.path.isfile(cache_path):
+        data = _read_cache(cache_path)
+    else:
+        data = _concat(
+            [
+                read_dataset(path, encoding, COLUMNS, normalized)
+                for path, encoding in paths
+            ]
+        )
+        if cache_path is not None:
+            data = _write_cache(data, cache_path)
+            # Arrow's allocator keeps the freed chunks of the parsed corpus
+            # for reuse, but they are too small for the whole columns to come
+            if pyarrow is not None:
+                pyarrow.default_memory_pool().release_unused()
+    return _shuffled(data, seed) if shuffle else data
+
+
+# Function to get the in-memory size of a frame in bytes, counting the
+# strings held by object columns
+def memory_bytes(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load the scraped corpus into the cache and describe it"
+    )
+    parser.add_argument("--fake", default=FAKE_CSV)
+    parser.add_argument("--true", default=TRUE_CSV)
+    parser.add_argument("--normalized", action="store_true")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    data = load_corpus(
+        args.fake, args.true, normalized=args.normalized, cache_dir=args.cache_dir
+    )
+    print(
+        f"Loaded {len(data)} rows in {time.perf_counter() - start:.1f}s,"
+        f" {memory_bytes(data) / 2**20:.1f} MB in memory"
+    )
+    print(data.dtypes.to_string())
@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+import http_cache
+import http_client
+
+# Number of requests in flight across all hosts
+DEFAULT_WORKERS = 16
+
+# Number of requests in flight against a single host
+DEFAULT_PER_HOST = 4
+
+
+# Function to perform one blocking GET over the shared keep-alive pool and
+# response cache, returning None once network errors have exhausted the retries
+def blocking_get(url, ttl=http_cache.ARTICLE_TTL):
+    try:
+        return http_cache.cached_get(url, ttl=ttl)
+    except requests.RequestException as error:
+        print(f"Request to {url} failed: {error}")
+        return None
+
+
+# Function to fetch a URL and process its response on the same thread
+def fetch_and_process(fetch, process, url):
+    return process(url, fetch(url))
+
+
+# Async fetch engine shared by all scrapers.
+# The event loop runs on a background thread so plain (synchronous) scraper
+# functions can submit link lists from any thread and still share the same
+# concurrency limits. Blocking requests are dispatched to a thread pool of
+# `workers` threads, and a semaphore per host caps how many of them may hit
+# the same site at once. Requests wait for their host's rate limit inside
+# those threads, so a throttled host holds at most `per_host` workers and
+# the others keep crawling the remaining hosts.
+class CrawlEngine:
+    def __init__(self, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, fetch=None):
+        self.workers = workers
+        self.per_host = per_host
+        self.fetch = fetch or blocking_get
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="crawl"
+        )
+        self._host_limits = {}
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="crawl-loop", daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def _fetch_one(self, fetch, url):
+        async with self._host_limit(url):
+            return await self._loop.run_in_executor(self._executor, fetch, url)
+
+    async def _fetch_many(self, fetch, urls):
+        return await asyncio.gather(*(self._fetch_one(fetch, url) for url in urls))
+
+    # Fetch every URL concurrently; responses come back in the order of `urls`.
+    # Keyword arguments (e.g. the cache `ttl`) are passed on to the fetch function.
+    # With `process`, process(url, response) is called on the worker thread
+    # that fetched each URL and its results come back instead.
+    def fetch_all(self, urls, process=None, **kwargs):
+        urls = list(urls)
+        if not urls:
+            return []
+        fetch = functools.partial(self.fetch, **kwargs) if kwargs else self.fetch
+        if process is not None:
+            fetch = functools.partial(fetch_and_process, fetch, process)
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._fetch_many(fetch, urls), loop)
+        return future.result()
+
+    # Run `function(*args)` for every argument tuple on its own thread so that
+    # independent sections feed their link lists into the engine concurrently
+    def map_sections(self, function, arguments):
+        arguments = list(arguments)
+        if not arguments:
+            return []
+        with ThreadPoolExecutor(max_workers=len(arguments)) as pool:
+            return list(pool.map(lambda args: function(*args), arguments))
+
+    def close(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+                self._host_limits = {}
+        self._executor.shutdown(wait=True)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+# Function to get the shared engine, creating it on first use
+def get_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = CrawlEngine()
+        return _engine
+
+
+# Function to replace the shared engine with one using the given limits.
+# With `rate_limit` every host is also held to its own request rate (see
+# rate_limiter.py).
+def configure(
+    workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, fetch=None, rate_limit=True
+):
+    global _engine
+    # Keep one pooled connection available per worker
+    http_client.configure(pool_maxsize=workers, rate_limit=rate_limit)
+    with _engine_lock:
+        previous, _engine = _engine, CrawlEngine(workers, per_host, fetch)
+    if previous is not None:
+        previous.close()
+    return _engine
+
+
+# Function to fetch a list of URLs through the shared engine
+def fetch_all(urls, process=None, **kwargs):
+    return get_engine().fetch_all(urls, process, **kwargs)
+
+
+# Function to run independent sections concurrently through the shared engine
+def map_sections(function, arguments):
+    return get_engine().map_sections(function, arguments)
+
+
+# Function to check whether a response can be parsed
+def is_ok(response):
+    return response is not None and response.status_code == 200
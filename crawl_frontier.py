@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import threading
+import time
+
+import crawl_engine
+import http_cache
+import instrumentation
+
+# File holding the seen-URL index
+FRONTIER_PATH = os.path.join(".crawl_state", "frontier.sqlite")
+
+# Number of listing pages fetched concurrently before checking whether the
+# crawl has reached articles it already knows
+DEFAULT_WINDOW = crawl_engine.DEFAULT_PER_HOST
+
+
+# Persisted index of article URLs already crawled, per source and category.
+# Listing pages are newest-first, so once a whole page consists of known
+# articles every later page is known too and pagination can stop.
+class Frontier:
+    def __init__(self, path=FRONTIER_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                source TEXT NOT NULL,
+                category TEXT NOT NULL,
+                url TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (source, category, url)
+            )
+            """)
+        self._db.commit()
+
+    # Function to return the subset of `urls` not crawled before
+    def unseen(self, source, category, urls):
+        urls = list(urls)
+        if not urls:
+            return set()
+        with self._lock:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (url TEXT)")
+            self._db.execute("DELETE FROM lookup")
+            self._db.executemany(
+                "INSERT INTO lookup VALUES (?)", [(url,) for url in urls]
+            )
+            known = {
+                url
+                for (url,) in self._db.execute(
+                    "SELECT url FROM seen WHERE source = ? AND category = ?"
+                    " AND url IN (SELECT url FROM lookup)",
+                    (source, category),
+                )
+            }
+        return set(urls) - known
+
+    # Function to record `urls` as crawled
+    def mark_seen(self, source, category, urls):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO seen VALUES (?, ?, ?, ?)",
+                [(source, category, url, now) for url in urls],
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_frontier = None
+_frontier_enabled = True
+_frontier_lock = threading.Lock()
+
+
+# Function to get the shared frontier, or None for a full crawl
+def get_frontier():
+    global _frontier
+    with _frontier_lock:
+        if _frontier is None and _frontier_enabled:
+            _frontier = Frontier()
+        return _frontier
+
+
+# Function to point the shared frontier at another file or disable it
+def configure(path=FRONTIER_PATH, enabled=True):
+    global _frontier, _frontier_enabled
+    with _frontier_lock:
+        previous = _frontier
+        _frontier_enabled = enabled
+        _frontier = Frontier(path) if enabled else None
+    if previous is not None:
+        previous.close()
+    return _frontier
+
+
+# Function to return the subset of `urls` not crawled before
+def unseen(source, category, urls):
+    frontier = get_frontier()
+    if frontier is None:
+        return set(urls)
+    return frontier.unseen(source, category, urls)
+
+
+# Function to record `urls` as crawled
+def mark_seen(source, category, urls):
+    frontier = get_frontier()
+    if frontier is not None:
+        frontier.mark_seen(source, category, urls)
+
+
+# Function to walk listing pages in order and collect items not seen before.
+# `extract_items(response)` returns (url, item) pairs for one listing page.
+# Pages are fetched `window` at a time; the walk stops after the first page
+# whose items are all known.
+def walk_pages(source, category, page_urls, extract_items, window=DEFAULT_WINDOW):
+    new_items = []
+    listed = set()
+
+    for start in range(0, len(page_urls), window):
+        batch = page_urls[start : start + window]
+        responses = crawl_engine.fetch_all(batch, ttl=http_cache.LISTING_TTL)
+
+        for page_url, response in zip(batch, responses):
+            instrumentation.count_response(
+                response, source=source, section=category, kind="listing"
+            )
+            if not crawl_engine.is_ok(response):
+                print(f"Failed to retrieve webpage from {page_url}")
+                instrumentation.event(
+                    "fetch_failed",
+                    source=source,
+                    section=category,
+                    kind="listing",
+                    url=page_url,
+                    status=response.status_code if response is not None else None,
+                )
+                continue
+
+            items = extract_items(response)
+            fresh = unseen(source, category, [url for url, _ in items])
+            for url, item in items:
+                # Pages shift while new articles are published, so the same
+                # article can show up on two consecutive pages
+                if url in fresh and url not in listed:
+                    listed.add(url)
+                    new_items.append((url, item))
+
+            if items and not fresh:
+                return new_items
+
+    return new_items
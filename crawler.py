@@ -0,0 +1,363 @@
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+import crawl_engine
+import crawl_frontier
+import date_parser
+import dedup_index
+import extraction
+import html_archive
+import http_cache
+import instrumentation
+import parse_pool
+from sources import SOURCES
+
+COLUMNS = ["Category", "Headline", "Content", "Published Date", "Label"]
+
+# Version of the records cached for article pages; records cached by
+# another version are extracted again
+RECORD_VERSION = 2
+
+
+# Function to list the listing-page URLs of a section, newest first
+def page_urls(source, section):
+    url = section["url"]
+    return [
+        (
+            source["first_page_url"].format(url=url)
+            if page_num == 1
+            else source["page_url"].format(url=url, page=page_num)
+        )
+        for page_num in range(1, section.get("max_pages", 1) + 1)
+    ]
+
+
+# Function to make a link absolute the way the sites link their articles
+def resolve_link(url, link):
+    return link if link.startswith("http") else url + link
+
+
+# Function to extract the content and raw date of an article page. The
+# date is normalized when the record is emitted, so cached records stay
+# valid when the date rules change.
+def parse_article(name, html_content):
+    article = extraction.extract_article(name, html_content)
+    content = (
+        article["content"] if article["content"] is not None else "Content not found"
+    )
+    return [content, article["date"]]
+
+
+# Function to clean a [headline, content, raw date] record and normalize
+# its date into the (headline, content, published date) that is written
+def prepare_record(name, record, clean):
+    headline, content, date_text = record
+    return clean(headline), clean(content), date_parser.normalize_date(name, date_text)
+
+
+# Function to extract and prepare one article page: the CPU-bound step,
+# run in the parse pool. Returns the raw [content, raw date] record, which
+# is cached, the prepared record and the seconds spent parsing and
+# cleaning.
+def process_article(name, html_content, headline, clean):
+    start = time.perf_counter()
+    record = parse_article(name, html_content)
+    parsed = time.perf_counter()
+    prepared = prepare_record(name, [headline] + record, clean)
+    return record, prepared, (parsed - start, time.perf_counter() - parsed)
+
+
+# Function to fetch the listed articles of a section and stream [headline,
+# content, raw date] records to `emit`, skipping articles that still failed
+# after retries. Every page is archived and handed to the parse pool by the
+# thread that fetched it, so pages are parsed while others are still
+# downloading. With `from_archive` the pages are read back from the archive
+# instead. Returns the links of the articles that were emitted.
+def fetch_articles(name, category, listed, clean, emit, from_archive=False):
+    headlines = dict(listed)
+
+    # Function run on the fetching thread of every article: reuse the record
+    # extracted last time when the page is unchanged, or hand the page to
+    # the parse pool, waiting while its queue is full
+    def hand_off(link, response):
+        instrumentation.count_response(
+            response, source=name, section=category, kind="article"
+        )
+        if not crawl_engine.is_ok(response):
+            return response, None
+        if not from_archive:
+            html_archive.add(
+                link, response.content, name, category, "article", headlines[link]
+            )
+        cached = http_cache.load_record(response)
+        if cached is not None and cached[0] == RECORD_VERSION:
+            return response, cached[1:]
+        return response, parse_pool.submit(
+            process_article, name, response.content, headlines[link], clean
+        )
+
+    links = []
+    if from_archive:
+        results = [hand_off(link, html_archive.fetch(link)) for link, _ in listed]
+    else:
+        results = crawl_engine.fetch_all([link for link, _ in listed], process=hand_off)
+    for (link, headline), (article_response, record) in zip(listed, results):
+        if record is None:
+            print(f"Failed to retrieve article from {link}")
+            instrumentation.event(
+                "fetch_failed",
+                source=name,
+                section=category,
+                kind="article",
+                url=link,
+                status=(
+                    article_response.status_code
+                    if article_response is not None
+                    else None
+                ),
+            )
+            continue
+
+        if isinstance(record, Future):
+            record, prepared, (parse_seconds, clean_seconds) = record.result()
+            instrumentation.observe("parse", parse_seconds, source=name, kind="article")
+            instrumentation.observe("clean", clean_seconds, source=name)
+            http_cache.save_record(article_response, [RECORD_VERSION] + record)
+            emit(link, [headline] + record, prepared)
+        else:
+            instrumentation.count("records_reused", source=name, section=category)
+            emit(link, [headline] + record)
+        links.append(link)
+    return links
+
+
+# Function to rebuild the listed (url, item) pairs of a section from the
+# archive: the items of every archived version of its listing pages and,
+# for sources with article pages, every archived article under the
+# headline it was crawled with unless an archived listing page lists it
+def archived_items(name, category, has_articles, extract_items):
+    items = {}
+    if has_articles:
+        for url, _, headline in html_archive.entries(name, category, "article"):
+            items[url] = headline
+    for _, response, _ in html_archive.iter_pages(name, category, "listing"):
+        items.update(extract_items(response))
+    return list(items.items())
+
+
+# Function to crawl one section of a source into `writer`.
+# Listing pages are walked until reaching articles seen in an earlier run,
+# then the details of the new articles are fetched concurrently. Records
+# are checked against the de-duplication index and written as soon as they
+# are extracted, and the articles are only added to the index and marked
+# as seen once the writer has flushed them. Every fetched page is
+# archived; with `from_archive` the stored articles of the section are
+# extracted again from the archived pages instead, without any network
+# traffic.
+def crawl_section(name, section, clean, writer, sources=SOURCES, from_archive=False):
+    source = sources[name]
+    url, category = section["url"], section["category"]
+    has_articles = "article" in source
+
+    # Extract (link, item) pairs from a listing page, parsed in the pool
+    def extract_items(response):
+        items = []
+        with instrumentation.timer("parse", source=name, kind="listing"):
+            listing = parse_pool.run(extraction.extract_listing, name, response.content)
+        for item in listing:
+            headline, link = item["headline"], item["link"]
+            if has_articles:
+                if headline and link:
+                    items.append((resolve_link(url, link), headline))
+                else:
+                    instrumentation.count(
+                        "parse_failures",
+                        source=name,
+                        section=category,
+                        field="listing_item",
+                    )
+                continue
+
+            headline = headline if headline is not None else "Headline not found"
+            content = (
+                item["content"] if item["content"] is not None else "Content not found"
+            )
+            key = resolve_link(url, link) if link else headline
+            items.append((key, [headline, content, item["date"]]))
+        return items
+
+    # Function to write one [headline, content, raw date] record, unless it
+    # duplicates an article already ingested into either corpus. `prepared`
+    # is the record already cleaned by the parse pool, if it was.
+    def emit(key, record, prepared=None):
+        headline, content, date_text = record
+        if headline == "Headline not found":
+            instrumentation.count(
+                "parse_failures", source=name, section=category, field="headline"
+            )
+        if content == "Content not found":
+            instrumentation.count(
+                "parse_failures", source=name, section=category, field="content"
+            )
+        if prepared is None:
+            with instrumentation.timer("clean", source=name):
+                prepared = prepare_record(name, record, clean)
+        headline, content, published = prepared
+        duplicate, token = dedup_index.reserve(source["corpus"], key, headline, content)
+        if duplicate is not None:
+            print(f"Skipping {key}: duplicate of {duplicate[1]} ({duplicate[0]})")
+            instrumentation.count("duplicates", source=name, section=category)
+            return
+
+        if published is None:
+            instrumentation.count(
+                "date_misses",
+                source=name,
+                section=category,
+                reason="unrecognized" if date_text else "missing",
+            )
+        writer.write(
+            {
+                "Category": category,
+                "Headline": headline,
+                "Content": content,
+                "Published Date": published,
+                "Label": source["label"],
+            }
+        )
+        if token is not None:
+            reserved.append(token)
+        written.append(key)
+        instrumentation.count("articles", source=name, section=category)
+
+    # Archive a fetched listing page, then extract its items
+    def archive_and_extract(response):
+        html_archive.add(response.url, response.content, name, category, "listing")
+        return extract_items(response)
+
+    # Articles written but only reserved in the de-duplication index, and
+    # the keys of every article written
+    reserved = []
+    written = []
+    start = time.perf_counter()
+    if from_archive:
+        # Only the articles the live crawls stored are extracted again, so
+        # the duplicates they rejected stay out
+        stored = html_archive.stored_keys(name, category)
+        listed = [
+            (key, item)
+            for key, item in archived_items(name, category, has_articles, extract_items)
+            if key in stored
+        ]
+    else:
+        listed = crawl_frontier.walk_pages(
+            name, category, page_urls(source, section), archive_and_extract
+        )
+    if has_articles:
+        # Articles whose headline was already ingested are not fetched again
+        known = [
+            link for link, headline in listed if dedup_index.has_headline(headline)
+        ]
+        fresh = [(link, headline) for link, headline in listed if link not in known]
+        keys = known + fetch_articles(name, category, fresh, clean, emit, from_archive)
+    else:
+        for key, record in listed:
+            emit(key, record)
+        keys = [key for key, _ in listed]
+
+    writer.flush()
+    dedup_index.commit(reserved)
+    if not from_archive:
+        html_archive.mark_stored(name, category, written)
+        crawl_frontier.mark_seen(name, category, keys)
+    seconds = time.perf_counter() - start
+    instrumentation.observe("section", seconds, source=name)
+    instrumentation.event(
+        "section_done",
+        source=name,
+        section=category,
+        listed=len(listed),
+        seconds=round(seconds, 3),
+    )
+
+
+# Function to pick the (source name, section) pairs to crawl
+def select_sections(corpus=None, names=None, categories=None, sources=SOURCES):
+    return [
+        (name, section)
+        for name, source in sources.items()
+        if (corpus is None or source["corpus"] == corpus)
+        and (not names or name in names)
+        for section in source["sections"]
+        if not categories or section["category"] in categories
+    ]
+
+
+# Function to list the categories of the chosen sections of a corpus, for
+# re-extracting them from the archive. Records are stored by category, so
+# a category can only be rebuilt whole: raises ValueError when one of them
+# also has sections of a source that was left out.
+def rebuild_categories(corpus, names=None, categories=None, sources=SOURCES):
+    selected = select_sections(corpus, names, categories, sources)
+    chosen = sorted({section["category"] for _, section in selected})
+    for name, section in select_sections(corpus, categories=chosen, sources=sources):
+        if (name, section) not in selected:
+            raise ValueError(
+                f"category {section['category']} is also crawled from {name},"
+                " which must be re-extracted with it"
+            )
+    return chosen
+
+
+# Function to crawl the chosen sources and sections concurrently into
+# `writer` (anything with write(record) and flush(), e.g. a ShardWriter).
+# All sections are scheduled at once on the crawl engine's worker pool;
+# `clean` is applied to every headline and content; with a parse pool it
+# runs in the parser processes, so it must be a module-level function.
+# With `from_archive` the sections are extracted from the HTML archive.
+def crawl_into(
+    writer,
+    clean,
+    corpus=None,
+    names=None,
+    categories=None,
+    sources=SOURCES,
+    from_archive=False,
+):
+    selected = select_sections(corpus, names, categories, sources)
+    crawl_engine.map_sections(
+        lambda name, section: crawl_section(
+            name, section, clean, writer, sources, from_archive
+        ),
+        selected,
+    )
+
+
+# In-memory writer collecting the records of a crawl
+class RecordList(list):
+    def write(self, record):
+        self.append(record)
+
+    def flush(self):
+        pass
+
+
+# Function to crawl the chosen sources and sections into a DataFrame, with
+# a datetime64 "Published Date" column
+def crawl(
+    clean,
+    corpus=None,
+    names=None,
+    categories=None,
+    sources=SOURCES,
+    from_archive=False,
+):
+    records = RecordList()
+    crawl_into(records, clean, corpus, names, categories, sources, from_archive)
+    dataframe = pd.DataFrame(records, columns=COLUMNS)
+    dataframe["Published Date"] = pd.to_datetime(
+        dataframe["Published Date"], format=date_parser.DATE_FORMAT
+    )
+    return dataframe
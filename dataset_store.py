@@ -0,0 +1,192 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+
+import date_parser
+
+# Directory holding the append-only shards of every corpus
+STORE_DIR = "dataset"
+
+# Directory holding the records re-extracted from the HTML archive, which
+# win over the records first stored for the same articles
+REBUILD_DIR = os.path.join(STORE_DIR, "rebuild")
+
+# Number of buffered records per partition before a shard is written
+CHUNK_SIZE = 500
+
+COLUMNS = ["Category", "Headline", "Content", "Published Date", "Label"]
+
+
+# Append-only writer of crawled records.
+# Records are buffered per partition (category and crawl date) and written
+# as a new JSONL shard once a buffer holds `chunk_size` records, so memory
+# stays bounded by one chunk per partition and every flushed shard
+# survives a crash later in the crawl. Shards are never rewritten;
+# de-duplication and sorting happen in compact().
+class ShardWriter:
+    def __init__(self, corpus, directory=STORE_DIR, chunk_size=CHUNK_SIZE):
+        self.root = os.path.join(directory, corpus)
+        self.chunk_size = chunk_size
+        self.crawl_date = date.today().isoformat()
+        self._buffers = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _partition(self, record):
+        return os.path.join(
+            self.root,
+            f"category={record['Category']}",
+            f"date={self.crawl_date}",
+        )
+
+    def _write_shard(self, partition, records):
+        os.makedirs(partition, exist_ok=True)
+        self._sequence += 1
+        name = f"part-{time.time_ns()}-{os.getpid()}-{self._sequence:05d}.jsonl"
+        path = os.path.join(partition, name)
+        # Write under a temporary name so readers never see half a shard
+        with open(f"{path}.tmp", "w", encoding="utf-8") as shard:
+            for record in records:
+                shard.write(json.dumps(record, ensure_ascii=False))
+                shard.write("\n")
+        os.replace(f"{path}.tmp", path)
+
+    # Function to buffer one record, writing a shard when the chunk is full
+    def write(self, record):
+        partition = self._partition(record)
+        with self._lock:
+            buffer = self._buffers.setdefault(partition, [])
+            buffer.append(record)
+            if len(buffer) >= self.chunk_size:
+                self._write_shard(partition, buffer)
+                self._buffers[partition] = []
+
+    # Function to write every buffered record to disk
+    def flush(self):
+        with self._lock:
+            for partition, buffer in self._buffers.items():
+                if buffer:
+                    self._write_shard(partition, buffer)
+            self._buffers = {}
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Function to check whether a corpus has any shard yet
+def has_shards(corpus, directory=STORE_DIR):
+    return any(iter_shards(corpus, directory))
+
+
+# Function to list the shard files of one category (or all), oldest first
+def iter_shards(corpus, directory=STORE_DIR, category=None):
+    root = os.path.join(directory, corpus)
+    if not os.path.isdir(root):
+        return
+    categories = [f"category={category}"] if category is not None else None
+    for category_dir in categories or sorted(os.listdir(root)):
+        category_path = os.path.join(root, category_dir)
+        if not os.path.isdir(category_path):
+            continue
+        for date_dir in sorted(os.listdir(category_path)):
+            date_path = os.path.join(category_path, date_dir)
+            for name in sorted(os.listdir(date_path)):
+                if name.endswith(".jsonl"):
+                    yield os.path.join(date_path, name)
+
+
+# Function to list the categories stored for a corpus, in sorted order
+def categories(corpus, directory=STORE_DIR):
+    root = os.path.join(directory, corpus)
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name.split("=", 1)[1]
+        for name in os.listdir(root)
+        if name.startswith("category=")
+    )
+
+
+# Function to stream the records of a corpus, category by category.
+# Within each category the records stored under `overrides` come first.
+def iter_records(corpus, directory=STORE_DIR, overrides=None):
+    directories = [overrides, directory] if overrides else [directory]
+    all_categories = set()
+    for store in directories:
+        all_categories.update(categories(corpus, store))
+    for category in sorted(all_categories):
+        for store in directories:
+            for path in iter_shards(corpus, store, category):
+                with open(path, encoding="utf-8") as shard:
+                    for line in shard:
+                        yield json.loads(line)
+
+
+# Function to delete every shard of a corpus, or of one of its categories
+def clear(corpus, directory=STORE_DIR, category=None):
+    path = os.path.join(directory, corpus)
+    if category is not None:
+        path = os.path.join(path, f"category={category}")
+    shutil.rmtree(path, ignore_errors=True)
+
+
+# Function to seed an empty store from a CSV written by an older version.
+# The CSV is read in chunks and each chunk passed through `transform` so
+# the rows can be normalized the same way new crawls are.
+def import_csv(corpus, path, transform=None, directory=STORE_DIR):
+    with ShardWriter(corpus, directory) as writer:
+        for chunk in pd.read_csv(path, chunksize=CHUNK_SIZE, dtype=str):
+            if transform is not None:
+                chunk = transform(chunk)
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for record in chunk.to_dict("records"):
+                writer.write(record)
+
+
+# Function to compact a corpus into a single CSV file.
+# Categories are written in sorted order and records in crawl order within
+# each category; the first record of every headline wins. Only a digest
+# per headline is kept in memory, never the records themselves. `keep`
+# optionally filters records. Dates stored by earlier versions are
+# rewritten in the typed "Published Date" format. Records stored under
+# `overrides` come first, so they win over those of `directory`.
+def compact(corpus, output_path, keep=None, directory=STORE_DIR, overrides=None):
+    seen_headlines = set()
+    written = 0
+    temporary_path = f"{output_path}.tmp"
+    with open(temporary_path, "w", newline="", encoding="utf-8-sig") as output:
+        writer = csv.writer(output)
+        writer.writerow(COLUMNS)
+        for record in iter_records(corpus, directory, overrides):
+            if keep is not None and not keep(record):
+                continue
+            headline = record.get("Headline") or ""
+            digest = hashlib.blake2b(headline.encode("utf-8"), digest_size=16).digest()
+            if digest in seen_headlines:
+                continue
+            seen_headlines.add(digest)
+            record["Published Date"] = date_parser.normalize_stored(
+                record.get("Published Date")
+            )
+            writer.writerow(
+                [
+                    "" if record.get(column) is None else record[column]
+                    for column in COLUMNS
+                ]
+            )
+            written += 1
+    os.replace(temporary_path, output_path)
+    return written
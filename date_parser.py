@@ -0,0 +1,165 @@
+import functools
+import re
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from sources import SOURCES
+
+# Format of the typed "Published Date" column; missing dates are left empty
+DATE_FORMAT = "%Y-%m-%d"
+
+# Number of distinct raw strings remembered per source. Articles of one
+# crawl share few distinct dates, so repeated strings cost a dict lookup.
+CACHE_SIZE = 4096
+
+# How "Published Date" values written by earlier versions look: ISO dates,
+# the former "%d/%m/%Y" output, the "%d-%m-%Y" dates of the checked-in
+# fake news CSV, or The Hindu's extracted "August 11, 2024" (the former
+# "Date not found" placeholder matches nothing)
+STORED_SPEC = {
+    "formats": [DATE_FORMAT, "%d/%m/%Y", "%d-%m-%Y", "%B %d, %Y", "%b %d, %Y"]
+}
+
+
+# Parser of the raw date strings of one source, following its date spec.
+# The spec (see sources.py) may "remove" characters and "split" off a
+# trailing part first, then search a regex "pattern" and keep the match,
+# and finally read an "iso" timestamp or try strptime "formats" in order.
+# Results are memoized per raw string, and the format that last succeeded
+# is tried first next time, since a source writes nearly all its dates the
+# same way. The formats of a spec must not disagree on the date of any
+# string (they may on the time), so their order never changes a result.
+# Strings no format matches are printed unless `report_misses` is off.
+class DateParser:
+    def __init__(self, spec, cache_size=CACHE_SIZE, report_misses=True):
+        self.spec = spec
+        self.report_misses = report_misses
+        self._formats = list(spec.get("formats", []))
+        self._split = re.compile(spec["split"]) if "split" in spec else None
+        self._pattern = re.compile(spec["pattern"]) if "pattern" in spec else None
+        self.parse = functools.lru_cache(maxsize=cache_size)(self._parse)
+
+    # Function to apply the text rules of the spec before parsing
+    def _prepare(self, date_text):
+        if "remove" in self.spec:
+            date_text = date_text.replace(self.spec["remove"], "")
+        if self._split is not None:
+            date_text = self._split.split(date_text, maxsplit=1)[0]
+        date_text = date_text.strip()
+        if self._pattern is not None:
+            date_only = self._pattern.search(date_text)
+            return date_only.group() if date_only else None
+        return date_text
+
+    # Function to parse a raw date string into a date, or None
+    def _parse(self, date_text):
+        if not date_text:
+            return None
+        date_text = self._prepare(date_text)
+        if date_text is None:
+            return None
+
+        if self.spec.get("iso"):
+            try:
+                return date.fromisoformat(date_text.split("T")[0])
+            except ValueError:
+                return None
+
+        formats = self._formats
+        for fmt in formats:
+            try:
+                parsed = datetime.strptime(date_text, fmt).date()
+            except ValueError:
+                continue
+            if fmt is not formats[0]:
+                # Rebind rather than reorder in place, for concurrent callers
+                self._formats = [fmt] + [other for other in formats if other != fmt]
+            return parsed
+
+        if self.report_misses:
+            print(f"Date format not recognized for: {date_text}")
+        return None
+
+    # Function to parse many raw date strings at once into a datetime64
+    # Series (NaT where no date is found). Only distinct strings are
+    # parsed, and each format is applied to all remaining strings in one
+    # vectorized pandas call.
+    def parse_many(self, values):
+        index = values.index if isinstance(values, pd.Series) else None
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        text = pd.Series(uniques, dtype="string")
+
+        if "remove" in self.spec:
+            text = text.str.replace(self.spec["remove"], "", regex=False)
+        if self._split is not None:
+            text = text.str.split(self._split, n=1, regex=True).str[0]
+        text = text.str.strip()
+        if self._pattern is not None:
+            text = text.str.extract(f"({self._pattern.pattern})", expand=False)
+
+        if self.spec.get("iso"):
+            parsed = pd.to_datetime(
+                text.str.split("T").str[0], format=DATE_FORMAT, errors="coerce"
+            )
+        else:
+            parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+            for fmt in self._formats:
+                missing = parsed.isna() & text.notna()
+                if not missing.any():
+                    break
+                parsed[missing] = pd.to_datetime(
+                    text[missing], format=fmt, errors="coerce"
+                )
+
+        parsed = parsed.dt.normalize().to_numpy()
+        # factorize codes missing values as -1
+        result = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]")
+        found = codes != -1
+        result[found] = parsed[codes[found]]
+        return pd.Series(result, index=index)
+
+
+# Parser of the values stored by earlier versions, which include the former
+# "Date not found" placeholder
+STORED = DateParser(STORED_SPEC, report_misses=False)
+
+_parsers = {}
+
+
+# Function to get the shared parser of a registered source
+def get_parser(source):
+    parser = _parsers.get(source)
+    if parser is None:
+        parser = _parsers.setdefault(source, DateParser(SOURCES[source]["date"]))
+    return parser
+
+
+# Function to format a date for the "Published Date" column
+def to_text(parsed):
+    return parsed.strftime(DATE_FORMAT) if parsed is not None else None
+
+
+# Function to normalize a raw date string of a source into the typed
+# "Published Date" value, or None when no date is found
+def normalize_date(source, date_text):
+    return to_text(get_parser(source).parse(date_text))
+
+
+# Function to normalize a "Published Date" value stored by any version
+def normalize_stored(value):
+    return to_text(STORED.parse(value))
+
+
+# Function to re-normalize a whole "Published Date" column in one call,
+# e.g. of a CSV written by an older version. Values are read with the date
+# spec of `source`, or as stored values when no source is given. Returns
+# the column as text (None where no date is found) or, with `typed`, as
+# datetime64.
+def normalize_column(values, source=None, typed=False):
+    parser = get_parser(source) if source is not None else STORED
+    parsed = parser.parse_many(values)
+    if typed:
+        return parsed
+    return parsed.dt.strftime(DATE_FORMAT).astype(object).where(parsed.notna(), None)
@@ -0,0 +1,321 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+# File holding the de-duplication index shared by both corpora
+INDEX_PATH = os.path.join(".crawl_state", "dedup.sqlite")
+
+# Words per shingle; texts with fewer words are only checked for exact copies
+SHINGLE_SIZE = 5
+
+# MinHash signature length, split into BANDS bands of ROWS values each.
+# With 32 bands of 4 rows, pairs above ~0.42 Jaccard similarity are likely
+# to share a band bucket and become candidates.
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity above which two texts are near-duplicates
+THRESHOLD = 0.8
+
+# Random multiply-shift hash functions, fixed so signatures stay comparable
+# between runs
+_random = np.random.RandomState(20240811)
+_MULTIPLIERS = _random.randint(0, 2**63, NUM_PERM, dtype=np.uint64) * 2 + 1
+_INCREMENTS = _random.randint(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+_NON_WORD = re.compile(r"\W+")
+
+
+# Function to normalize a text before hashing
+def normalize(text):
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+# Function to compute the exact-match digest of a normalized text
+def digest(normalized):
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+
+# Function to compute the MinHash signature of a normalized text, or None
+# when it is too short to shingle
+def signature(normalized):
+    words = normalized.split()
+    if len(words) < SHINGLE_SIZE:
+        return None
+    shingles = {
+        " ".join(words[start : start + SHINGLE_SIZE])
+        for start in range(len(words) - SHINGLE_SIZE + 1)
+    }
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # h(x) = (a * x + b) mod 2**64 >> 32, for every hash function at once
+    with np.errstate(over="ignore"):
+        mixed = _MULTIPLIERS[:, None] * hashes[None, :] + _INCREMENTS[:, None]
+    return (mixed >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+# Function to compute the headline digest, content digest and content
+# signature an article is indexed under
+def _hashes(headline, content):
+    normalized = normalize(content)
+    return digest(normalize(headline)), digest(normalized), signature(normalized)
+
+
+# Persistent index of ingested articles across the true and fake corpora.
+# Exact copies are found through a digest of the normalized headline and
+# content; near-duplicates through locality-sensitive hashing of MinHash
+# signatures, where every band of a signature is an indexed bucket. A
+# lookup only reads the rows sharing a bucket, so its cost grows with the
+# number of candidates rather than the size of the corpus.
+class DedupIndex:
+    def __init__(self, path=INDEX_PATH, threshold=THRESHOLD):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Every ingested article commits, so avoid a full sync per commit
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS exact (
+                kind TEXT NOT NULL,
+                digest BLOB NOT NULL,
+                corpus TEXT NOT NULL,
+                key TEXT,
+                PRIMARY KEY (kind, digest)
+            );
+            CREATE TABLE IF NOT EXISTS signatures (
+                id INTEGER PRIMARY KEY,
+                corpus TEXT NOT NULL,
+                key TEXT,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL,
+                bucket BLOB NOT NULL,
+                signature_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS bands_bucket ON bands (band, bucket);
+            """)
+        self._db.commit()
+        # Articles reserved but not committed yet, by token, and their
+        # exact digests
+        self._pending = {}
+        self._pending_exact = {}
+        self._next_token = 0
+
+    def _find_exact(self, kind, text_digest):
+        return self._db.execute(
+            "SELECT corpus, key FROM exact WHERE kind = ? AND digest = ?",
+            (kind, text_digest),
+        ).fetchone()
+
+    def _find_similar(self, text_signature):
+        candidates = set()
+        for band in range(BANDS):
+            bucket = text_signature[band * ROWS : (band + 1) * ROWS].tobytes()
+            candidates.update(
+                signature_id
+                for (signature_id,) in self._db.execute(
+                    "SELECT signature_id FROM bands WHERE band = ? AND bucket = ?",
+                    (band, bucket),
+                )
+            )
+        for signature_id in candidates:
+            corpus, key, stored = self._db.execute(
+                "SELECT corpus, key, signature FROM signatures WHERE id = ?",
+                (signature_id,),
+            ).fetchone()
+            stored = np.frombuffer(stored, dtype=np.uint32)
+            if np.mean(stored == text_signature) >= self.threshold:
+                return corpus, key
+        return None
+
+    # Function to find the article a new one duplicates among the ingested
+    # and the reserved articles, or None
+    def _match(self, headline_digest, content_digest, content_signature):
+        match = self._find_exact("headline", headline_digest)
+        if match is None:
+            match = self._pending_exact.get(("headline", headline_digest))
+        # Placeholder and very short contents are shared by unrelated
+        # articles, so only contents long enough to shingle are compared
+        if match is None and content_signature is not None:
+            match = self._find_exact("content", content_digest)
+            if match is None:
+                match = self._pending_exact.get(("content", content_digest))
+            if match is None:
+                match = self._find_similar(content_signature)
+            if match is None:
+                match = self._find_similar_pending(content_signature)
+        return match
+
+    def _find_similar_pending(self, text_signature):
+        for corpus, key, _, _, stored in self._pending.values():
+            if stored is not None and np.mean(stored == text_signature) >= (
+                self.threshold
+            ):
+                return corpus, key
+        return None
+
+    # Function to add an article to the index, without committing
+    def _insert(self, corpus, key, headline_digest, content_digest, content_signature):
+        self._db.execute(
+            "INSERT OR IGNORE INTO exact VALUES ('headline', ?, ?, ?)",
+            (headline_digest, corpus, key),
+        )
+        if content_signature is None:
+            return
+        self._db.execute(
+            "INSERT OR IGNORE INTO exact VALUES ('content', ?, ?, ?)",
+            (content_digest, corpus, key),
+        )
+        signature_id = self._db.execute(
+            "INSERT INTO signatures (corpus, key, signature) VALUES (?, ?, ?)",
+            (corpus, key, content_signature.tobytes()),
+        ).lastrowid
+        self._db.executemany(
+            "INSERT INTO bands VALUES (?, ?, ?)",
+            [
+                (
+                    band,
+                    content_signature[band * ROWS : (band + 1) * ROWS].tobytes(),
+                    signature_id,
+                )
+                for band in range(BANDS)
+            ],
+        )
+
+    # Function to check whether a headline was ingested before
+    def has_headline(self, headline):
+        with self._lock:
+            return self._find_exact("headline", digest(normalize(headline))) is not None
+
+    # Function to ingest an article unless it duplicates one ingested or
+    # reserved before. Returns the (corpus, key) of the earlier article for
+    # duplicates, or None after adding the article to the index.
+    def check_and_add(self, corpus, key, headline, content):
+        hashes = _hashes(headline, content)
+        with self._lock:
+            match = self._match(*hashes)
+            if match is not None:
+                return match
+            self._insert(corpus, key, *hashes)
+            self._db.commit()
+        return None
+
+    # Function to reserve an article unless it duplicates one ingested or
+    # reserved before. Reserved articles count as ingested for later checks
+    # in this process but only reach the index once commit() is called with
+    # their token, after the records are safely stored, so an article lost
+    # in a crash is fetched again by the next crawl. Returns (match, token):
+    # the (corpus, key) of the earlier article and None for duplicates, None
+    # and the reservation token otherwise.
+    def reserve(self, corpus, key, headline, content):
+        hashes = _hashes(headline, content)
+        with self._lock:
+            match = self._match(*hashes)
+            if match is not None:
+                return match, None
+            self._next_token += 1
+            token = self._next_token
+            headline_digest, content_digest, content_signature = hashes
+            self._pending[token] = (corpus, key, *hashes)
+            self._pending_exact[("headline", headline_digest)] = (corpus, key)
+            if content_signature is not None:
+                self._pending_exact[("content", content_digest)] = (corpus, key)
+        return None, token
+
+    # Function to add the reserved articles of `tokens` to the index
+    def commit(self, tokens):
+        with self._lock:
+            for token in tokens:
+                corpus, key, headline_digest, content_digest, content_signature = (
+                    self._pending.pop(token)
+                )
+                self._insert(
+                    corpus, key, headline_digest, content_digest, content_signature
+                )
+                self._pending_exact.pop(("headline", headline_digest), None)
+                self._pending_exact.pop(("content", content_digest), None)
+            self._db.commit()
+
+    # Function to check whether nothing has been ingested yet
+    def is_empty(self):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM exact LIMIT 1").fetchone() is None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_index = None
+_index_enabled = True
+_index_lock = threading.Lock()
+
+
+# Function to get the shared index, or None when de-duplication is disabled
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None and _index_enabled:
+            _index = DedupIndex()
+        return _index
+
+
+# Function to point the shared index at another file or disable it
+def configure(path=INDEX_PATH, enabled=True):
+    global _index, _index_enabled
+    with _index_lock:
+        previous = _index
+        _index_enabled = enabled
+        _index = DedupIndex(path) if enabled else None
+    if previous is not None:
+        previous.close()
+    return _index
+
+
+# Function to check whether a headline was ingested before
+def has_headline(headline):
+    index = get_index()
+    return index is not None and index.has_headline(headline)
+
+
+# Function to ingest an article, returning the earlier article it duplicates
+def check_and_add(corpus, key, headline, content):
+    index = get_index()
+    if index is None:
+        return None
+    return index.check_and_add(corpus, key, headline, content)
+
+
+# Function to reserve an article, returning (duplicated article, token)
+def reserve(corpus, key, headline, content):
+    index = get_index()
+    if index is None:
+        return None, None
+    return index.reserve(corpus, key, headline, content)
+
+
+# Function to add reserved articles to the index once they are stored
+def commit(tokens):
+    index = get_index()
+    if index is not None and tokens:
+        index.commit(tokens)
+
+
+# Function to index records already stored, e.g. when the index is new
+def add_records(corpus, records):
+    for record in records:
+        check_and_add(corpus, None, record["Headline"] or "", record["Content"] or "")
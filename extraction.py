@@ -0,0 +1,66 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+from sources import SOURCES
+
+# Use the C-backed lxml parser when it is installed
+try:
+    import lxml  # noqa: F401
+
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+
+# The selectors of every source are declared once in the source registry.
+# A page type lists the tags to keep while parsing ("parse_only", either tag
+# names or a (name, attributes) pair), so only those subtrees are built,
+# and the fields to extract as CSS selectors.
+# A field given as (selector, attribute) reads that attribute instead of
+# the element text, and a None selector means the element itself.
+# Listing pages also name the "item" selector matching one listed article,
+# and their field selectors are relative to that item (see sources.py).
+#
+# Function to parse only the parts of a document a page type needs
+def parse(html_content, parse_only):
+    if isinstance(parse_only, tuple):
+        strainer = SoupStrainer(*parse_only)
+    else:
+        strainer = SoupStrainer(parse_only)
+    return BeautifulSoup(html_content, PARSER, parse_only=strainer)
+
+
+# Function to read one field from an element, or None when it is missing
+def select_value(element, selector):
+    attribute = None
+    if isinstance(selector, tuple):
+        selector, attribute = selector
+    if selector is not None:
+        element = element.select_one(selector)
+        if element is None:
+            return None
+    if attribute is not None:
+        return element.get(attribute)
+    return element.get_text().strip()
+
+
+# Function to extract every listed article of a listing page as a dict
+def extract_listing(source, html_content):
+    spec = SOURCES[source]["listing"]
+    soup = parse(html_content, spec["parse_only"])
+    return [
+        {
+            field: select_value(item, selector)
+            for field, selector in spec["fields"].items()
+        }
+        for item in soup.select(spec["item"])
+    ]
+
+
+# Function to extract the fields of an article page as a dict
+def extract_article(source, html_content):
+    spec = SOURCES[source]["article"]
+    soup = parse(html_content, spec["parse_only"])
+    return {
+        field: select_value(soup, selector)
+        for field, selector in spec["fields"].items()
+    }
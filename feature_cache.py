@@ -0,0 +1,408 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import zlib
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+import feature_store
+import text_normalizer
+
+# Directory holding one subdirectory per cached featurization
+CACHE_DIR = ".feature_cache"
+
+# Total size of the cache beyond which the least recently used entries are
+# deleted
+MAX_BYTES = 4 * 2**30
+
+# Bumped whenever the layout or meaning of an entry changes
+CACHE_VERSION = 1
+
+# Incremental entries hold rows out by a hash of their content, like
+# streaming_training, so every row keeps its side of the split as the
+# corpus grows
+TEST_PERCENT = 30
+
+# Share of new rows, relative to the rows an incremental entry holds,
+# beyond which its frozen vocabulary is considered stale and refitted
+REFIT_FRACTION = 0.5
+
+FEATURIZER_FILE = "featurizer.joblib"
+
+META_FILE = "meta.json"
+
+# File whose modification time records when an entry was last used
+USED_FILE = "last_used"
+
+PARTS = ("train", "test")
+
+
+# Function to describe an estimator and its parameters as JSON-friendly
+# values that are the same from one run to the next: functions and
+# classes are named rather than printed with their address
+def describe(value):
+    if hasattr(value, "get_params") and not isinstance(value, type):
+        return {
+            "class": f"{type(value).__module__}.{type(value).__qualname__}",
+            "params": {
+                name: describe(param)
+                for name, param in sorted(value.get_params(deep=False).items())
+            },
+        }
+    if isinstance(value, (list, tuple)):
+        return [describe(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): describe(item) for key, item in sorted(value.items())}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if callable(value):
+        return f"{value.__module__}.{getattr(value, '__qualname__', repr(value))}"
+    return repr(value)
+
+
+# Function to hash every (label, text) row to a 64-bit digest
+def row_digests(texts, labels):
+    return np.fromiter(
+        (
+            int.from_bytes(
+                hashlib.blake2b(
+                    f"{label}\0{text}".encode("utf-8"), digest_size=8
+                ).digest(),
+                "little",
+            )
+            for text, label in zip(texts, labels)
+        ),
+        dtype=np.uint64,
+        count=len(texts),
+    )
+
+
+# Function to flag the rows held out in incremental mode
+def is_test(texts, test_percent=TEST_PERCENT):
+    return np.fromiter(
+        (zlib.crc32(text.encode("utf-8")) % 100 < test_percent for text in texts),
+        dtype=bool,
+        count=len(texts),
+    )
+
+
+# Function to build the key of an entry from everything its features
+# depend on
+def cache_key(featurizer, **fields):
+    description = dict(
+        fields,
+        version=CACHE_VERSION,
+        sklearn_version=sklearn.__version__,
+        normalizer_version=text_normalizer.NORMALIZER_VERSION,
+        featurizer=describe(featurizer),
+    )
+    encoded = json.dumps(description, sort_keys=True, default=repr).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+# Function to get the last step of a featurizer, the one naming the features
+def _vectorizer(featurizer):
+    return featurizer[-1] if isinstance(featurizer, Pipeline) else featurizer
+
+
+# Function to fit a featurizer on the training rows, dropping what older
+# scikit-learn versions keep of the terms cut by max_features, which would
+# only make the cached featurizer larger and slower to load
+def _fit(featurizer, texts):
+    features = featurizer.fit_transform(texts)
+    vectorizer = _vectorizer(featurizer)
+    if hasattr(vectorizer, "stop_words_"):
+        del vectorizer.stop_words_
+    return features
+
+
+# Function to write an entry: the fitted featurizer, the matrix and labels
+# of every part with their row digests when given, and a description.
+# The entry is only put in place once complete.
+def _save(path, featurizer, parts, meta, digests=None):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    os.makedirs(temporary_path)
+    joblib.dump(featurizer, os.path.join(temporary_path, FEATURIZER_FILE))
+    feature_names = _vectorizer(featurizer).get_feature_names_out()
+    for part, (matrix, labels) in parts.items():
+        feature_store.save(
+            os.path.join(temporary_path, part), matrix, feature_names, labels
+        )
+        if digests is not None:
+            np.save(os.path.join(temporary_path, f"{part}_digests.npy"), digests[part])
+    with open(os.path.join(temporary_path, META_FILE), "w", encoding="utf-8") as output:
+        json.dump(dict(meta, created_at=time.time()), output, indent=2)
+    open(os.path.join(temporary_path, USED_FILE), "w").close()
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temporary_path, path)
+
+
+# Function to read an entry back, its matrices memory-mapped. Returns the
+# featurizer, the (matrix, labels) of every part and their row digests
+# (None when the entry has none), or None when the entry cannot be read.
+def _load(path):
+    try:
+        featurizer = joblib.load(os.path.join(path, FEATURIZER_FILE))
+        parts = {}
+        digests = {}
+        for part in PARTS:
+            matrix, _, labels = feature_store.load(os.path.join(path, part))
+            parts[part] = (matrix, labels)
+            digests_path = os.path.join(path, f"{part}_digests.npy")
+            if os.path.isfile(digests_path):
+                digests[part] = np.load(digests_path)
+    except (OSError, ValueError, EOFError):
+        return None
+    _touch(path)
+    return featurizer, parts, digests or None
+
+
+# Function to record that an entry was just used
+def _touch(path):
+    try:
+        os.utime(os.path.join(path, USED_FILE))
+    except FileNotFoundError:
+        pass
+
+
+# Function to list the entries of the cache as (last used, bytes, path),
+# least recently used first
+def entries(cache_dir=CACHE_DIR):
+    if not os.path.isdir(cache_dir):
+        return []
+    listed = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith(".tmp") or not os.path.isdir(path):
+            continue
+        size = sum(
+            os.path.getsize(os.path.join(directory, file_name))
+            for directory, _, file_names in os.walk(path)
+            for file_name in file_names
+        )
+        try:
+            used = os.path.getmtime(os.path.join(path, USED_FILE))
+        except FileNotFoundError:
+            used = 0.0
+        listed.append((used, size, path))
+    return sorted(listed)
+
+
+# Function to delete the least recently used entries until the cache fits
+# in `max_bytes`, never deleting `keep`. Returns the deleted paths.
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, keep=None):
+    listed = entries(cache_dir)
+    total = sum(size for _, size, _ in listed)
+    deleted = []
+    for _, size, path in listed:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        deleted.append(path)
+    return deleted
+
+
+# Function to split texts and labels like train_test_split and vectorize
+# both parts, fitting `featurizer` on the training part. The fitted
+# featurizer and both matrices are cached under `cache_dir`, keyed by the
+# content of the corpus, the normalizer version, the featurizer and its
+# parameters and the split, so a rerun or another model on the same
+# corpus loads them instead (None disables the cache). Returns the fitted
+# featurizer, the train and test matrices and the train and test labels.
+def split_features(
+    texts,
+    labels,
+    featurizer,
+    test_size,
+    seed,
+    cache_dir=CACHE_DIR,
+    max_bytes=MAX_BYTES,
+):
+    labels = np.asarray(labels)
+    path = None
+    if cache_dir is not None:
+        corpus = hashlib.blake2b(
+            row_digests(texts, labels).tobytes(), digest_size=16
+        ).hexdigest()
+        key = cache_key(
+            featurizer, corpus=corpus, test_size=test_size, seed=seed, mode="split"
+        )
+        path = os.path.join(cache_dir, key)
+        entry = _load(path) if os.path.isdir(path) else None
+        if entry is not None:
+            featurizer, parts, _ = entry
+            (x_train, y_train), (x_test, y_test) = parts["train"], parts["test"]
+            return featurizer, x_train, x_test, y_train, y_test
+
+    texts_train, texts_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=test_size, random_state=seed
+    )
+    x_train = _fit(featurizer, texts_train)
+    x_test = featurizer.transform(texts_test)
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _save(
+            path,
+            featurizer,
+            {"train": (x_train, y_train), "test": (x_test, y_test)},
+            {
+                "mode": "split",
+                "rows": len(labels),
+                "test_size": test_size,
+                "seed": seed,
+            },
+        )
+        evict(cache_dir, max_bytes, keep=path)
+    return featurizer, x_train, x_test, y_train, y_test
+
+
+# Function to get the features of one part of the corpus from the rows an
+# incremental entry already holds, vectorizing only the rows it does not.
+# Returns the part's (matrix, labels) in the order of `texts`, and the
+# entry's rows with the new ones appended, or None when there were none.
+def _extend(featurizer, stored, stored_digests, texts, labels, digests):
+    matrix, stored_labels = stored
+    position = {digest: row for row, digest in enumerate(stored_digests.tolist())}
+    new_rows = []
+    for row, digest in enumerate(digests.tolist()):
+        if digest not in position:
+            position[digest] = len(stored_digests) + len(new_rows)
+            new_rows.append(row)
+
+    updated = None
+    if new_rows:
+        new_texts = [texts[row] for row in new_rows]
+        matrix = sp.vstack([matrix, featurizer.transform(new_texts)], format="csr")
+        stored_labels = np.concatenate([stored_labels, labels[new_rows]])
+        stored_digests = np.concatenate([stored_digests, digests[new_rows]])
+        updated = (matrix, stored_labels, stored_digests)
+    rows = np.fromiter(
+        (position[digest] for digest in digests.tolist()),
+        dtype=np.int64,
+        count=len(digests),
+    )
+    if len(rows) == matrix.shape[0] and np.array_equal(rows, np.arange(len(rows))):
+        # Same rows in the same order: no need to copy the stored matrix
+        return (matrix, stored_labels), updated
+    return (sp.csr_matrix(matrix)[rows], np.asarray(stored_labels)[rows]), updated
+
+
+# Function to vectorize a growing corpus with a frozen vocabulary. The
+# featurizer is fitted once, on the training rows of the first corpus it
+# sees; later calls reuse it and the stored features of every row seen
+# before, and only transform rows scraped since. Rows are held out by a
+# hash of their content (`test_percent` out of 100). Once the new rows
+# outnumber REFIT_FRACTION of the stored ones, the featurizer is fitted
+# again on the whole corpus. Returns the same as split_features.
+def incremental_features(
+    texts,
+    labels,
+    featurizer,
+    test_percent=TEST_PERCENT,
+    cache_dir=CACHE_DIR,
+    max_bytes=MAX_BYTES,
+):
+    texts = list(texts)
+    labels = np.asarray(labels)
+    digests = row_digests(texts, labels)
+    test = is_test(texts, test_percent)
+    masks = {"train": ~test, "test": test}
+    key = cache_key(featurizer, test_percent=test_percent, mode="incremental")
+    path = os.path.join(cache_dir, key)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    entry = _load(path) if os.path.isdir(path) else None
+    if entry is not None and entry[2] is not None:
+        stored_featurizer, stored_parts, stored_digests = entry
+        known = set(stored_digests["train"].tolist())
+        known.update(stored_digests["test"].tolist())
+        new = sum(digest not in known for digest in digests.tolist())
+        if new <= REFIT_FRACTION * len(known):
+            results = {}
+            updates = {}
+            for part, mask in masks.items():
+                results[part], updates[part] = _extend(
+                    stored_featurizer,
+                    stored_parts[part],
+                    stored_digests[part],
+                    [text for text, keep in zip(texts, mask) if keep],
+                    labels[mask],
+                    digests[mask],
+                )
+            if any(update is not None for update in updates.values()):
+                parts = {}
+                part_digests = {}
+                for part in PARTS:
+                    matrix, part_labels, part_digests[part] = updates[part] or (
+                        *stored_parts[part],
+                        stored_digests[part],
+                    )
+                    parts[part] = (matrix, part_labels)
+                _save(
+                    path,
+                    stored_featurizer,
+                    parts,
+                    {"mode": "incremental", "test_percent": test_percent},
+                    part_digests,
+                )
+                evict(cache_dir, max_bytes, keep=path)
+            (x_train, y_train), (x_test, y_test) = results["train"], results["test"]
+            return stored_featurizer, x_train, x_test, y_train, y_test
+
+    # First corpus, or too much has changed: fit on every training row
+    parts = {}
+    part_digests = {}
+    for part, mask in masks.items():
+        part_texts = [text for text, keep in zip(texts, mask) if keep]
+        if part == "train":
+            matrix = _fit(featurizer, part_texts)
+        else:
+            matrix = featurizer.transform(part_texts)
+        parts[part] = (matrix, labels[mask])
+        part_digests[part] = digests[mask]
+    _save(
+        path,
+        featurizer,
+        parts,
+        {"mode": "incremental", "test_percent": test_percent},
+        part_digests,
+    )
+    evict(cache_dir, max_bytes, keep=path)
+    (x_train, y_train), (x_test, y_test) = parts["train"], parts["test"]
+    return featurizer, x_train, x_test, y_train, y_test
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="List the cached featurizations, least recently used first"
+    )
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        help="evict least recently used entries down to this size first",
+    )
+    args = parser.parse_args()
+
+    if args.max_bytes is not None:
+        for path in evict(args.cache_dir, args.max_bytes):
+            print(f"Evicted {path}")
+    for used, size, path in entries(args.cache_dir):
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as meta:
+            meta = json.load(meta)
+        print(
+            f"{os.path.basename(path)}  {meta['mode']:<12}"
+            f"{size / 2**20:>9.1f} MB  last used {time.ctime(used)}"
+        )
@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Directory holding saved feature matrices, one subdirectory each
+FEATURES_DIR = "features"
+
+META_FILE = "meta.json"
+
+
+# Sparse feature matrices on disk.
+# A CSR matrix is stored as its three arrays (data, indices, indptr) in
+# .npy files next to the feature names and optional labels, so loading
+# memory-maps the arrays instead of reading or copying them, and nothing
+# is ever densified.
+#
+# Function to save a sparse matrix with its feature names and labels
+def save(path, matrix, feature_names, labels=None):
+    matrix = sp.csr_matrix(matrix)
+    matrix.sort_indices()
+    temporary_path = f"{path}.tmp"
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    os.makedirs(temporary_path)
+
+    np.save(os.path.join(temporary_path, "data.npy"), matrix.data)
+    np.save(os.path.join(temporary_path, "indices.npy"), matrix.indices)
+    np.save(os.path.join(temporary_path, "indptr.npy"), matrix.indptr)
+    np.save(
+        os.path.join(temporary_path, "feature_names.npy"),
+        np.asarray(feature_names, dtype=str),
+    )
+    if labels is not None:
+        np.save(os.path.join(temporary_path, "labels.npy"), np.asarray(labels))
+    with open(os.path.join(temporary_path, META_FILE), "w", encoding="utf-8") as meta:
+        json.dump(
+            {
+                "shape": list(matrix.shape),
+                "nnz": int(matrix.nnz),
+                "dtype": str(matrix.dtype),
+                "labels": labels is not None,
+            },
+            meta,
+        )
+
+    # Replace any earlier save only once the new one is complete
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temporary_path, path)
+
+
+# Function to load a saved matrix, its feature names and labels (None when
+# none were saved). The arrays are memory-mapped read-only unless
+# `mmap_mode` is None.
+def load(path, mmap_mode="r"):
+    with open(os.path.join(path, META_FILE), encoding="utf-8") as meta:
+        meta = json.load(meta)
+
+    def array(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    matrix = sp.csr_matrix(
+        (array("data"), array("indices"), array("indptr")),
+        shape=tuple(meta["shape"]),
+        copy=False,
+    )
+    labels = array("labels") if meta["labels"] else None
+    return matrix, array("feature_names"), labels
+
+
+# Function to list the `k` highest-weighted terms of each chosen row (all
+# by default) as (term, weight) pairs, reading only the row's stored values
+def top_terms(matrix, feature_names, k=10, rows=None):
+    matrix = sp.csr_matrix(matrix)
+    rows = range(matrix.shape[0]) if rows is None else rows
+    result = []
+    for row in rows:
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        weights = np.asarray(matrix.data[start:end])
+        columns = np.asarray(matrix.indices[start:end])
+        if len(weights) > k:
+            best = np.argpartition(weights, -k)[-k:]
+        else:
+            best = np.arange(len(weights))
+        best = best[np.argsort(-weights[best], kind="stable")]
+        result.append(
+            [(str(feature_names[columns[i]]), float(weights[i])) for i in best]
+        )
+    return result
+
+
+# Function to show the top terms of the chosen rows as a DataFrame with one
+# row per document and "term (weight)" columns
+def top_terms_frame(matrix, feature_names, k=10, rows=None):
+    rows = range(sp.csr_matrix(matrix).shape[0]) if rows is None else rows
+    return pd.DataFrame(
+        [
+            [f"{term} ({weight:.3f})" for term, weight in terms]
+            + [""] * (k - len(terms))
+            for terms in top_terms(matrix, feature_names, k, rows)
+        ],
+        index=list(rows),
+        columns=[f"top_{rank}" for rank in range(1, k + 1)],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Inspect the top terms of a saved sparse feature matrix"
+    )
+    parser.add_argument("path", help="directory written by feature_store.save")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=5, help="first rows to show")
+    args = parser.parse_args()
+
+    matrix, feature_names, labels = load(args.path)
+    density = matrix.nnz / max(matrix.shape[0] * matrix.shape[1], 1)
+    print(
+        f"{matrix.shape[0]} documents x {matrix.shape[1]} features,"
+        f" {matrix.nnz} stored values ({density:.2%} dense)"
+    )
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(
+            top_terms_frame(
+                matrix, feature_names, args.top, range(min(args.rows, matrix.shape[0]))
+            )
+        )
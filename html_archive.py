@@ -0,0 +1,328 @@
+import argparse
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+# Compress with zstandard when it is installed, gzip otherwise. Segments
+# are named by their compression, so an archive can mix both.
+try:
+    import zstandard
+
+    COMPRESSION = "zst"
+except ImportError:
+    zstandard = None
+    COMPRESSION = "gz"
+
+# Directory holding the segments and their index
+ARCHIVE_DIR = "archive"
+
+# Size of a segment file before the next page starts a new one
+SEGMENT_BYTES = 256 * 1024 * 1024
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+# Function to compress one page body
+def compress(body, compression=COMPRESSION):
+    if compression == "zst":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# Function to decompress one page body
+def decompress(data, compression):
+    if compression == "zst":
+        if zstandard is None:
+            raise RuntimeError("reading zstd segments needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+# Append-only, content-addressed archive of every fetched page.
+# Bodies are stored once per SHA-256 digest, each compressed on its own and
+# appended to the current segment file, so one seek and one read give back
+# any page. An sqlite index maps every digest to its segment, offset and
+# length, and records which URL served it, when, for which source and
+# section, as a listing or an article page, and under which headline.
+# A body is written before its index entry, so a crash can at worst leave
+# unreferenced bytes at the end of a segment.
+class HtmlArchive:
+    def __init__(
+        self,
+        directory=ARCHIVE_DIR,
+        segment_bytes=SEGMENT_BYTES,
+        compression=COMPRESSION,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compression = compression
+        os.makedirs(os.path.join(directory, "segments"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._segment = None
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                source TEXT NOT NULL,
+                category TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                headline TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (url, digest)
+            )
+            """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS pages_section ON pages (source, category, kind)"
+        )
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS stored (
+                source TEXT NOT NULL,
+                category TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (source, category, key)
+            )
+            """)
+        self._db.commit()
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, "segments", segment)
+
+    # Function to pick the segment new bodies are appended to: the last one
+    # of the current compression while it is under the size limit
+    def _current_segment(self):
+        if self._segment is None:
+            names = sorted(os.listdir(os.path.join(self.directory, "segments")))
+            numbers = [int(name.split(".")[0]) for name in names]
+            current = [name for name in names if name.endswith(f".{self.compression}")]
+            if current:
+                self._segment = current[-1]
+            else:
+                self._segment = f"{max(numbers, default=0) + 1:06d}.{self.compression}"
+        path = self._segment_path(self._segment)
+        if os.path.isfile(path) and os.path.getsize(path) >= self.segment_bytes:
+            number = int(self._segment.split(".")[0]) + 1
+            self._segment = f"{number:06d}.{self.compression}"
+        return self._segment
+
+    def _has_blob(self, digest):
+        return (
+            self._db.execute(
+                "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+            is not None
+        )
+
+    # Function to archive a fetched page, returning its digest. The body is
+    # only stored if no page had the same bytes before.
+    def add(self, url, body, source, category, kind, headline=None):
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            stored = self._has_blob(digest)
+        # Compress outside the lock so concurrent fetchers do not queue up
+        data = None if stored else compress(body, self.compression)
+        with self._lock:
+            if data is not None and not self._has_blob(digest):
+                segment = self._current_segment()
+                with open(self._segment_path(segment), "ab") as segment_file:
+                    offset = segment_file.tell()
+                    segment_file.write(data)
+                self._db.execute(
+                    "INSERT INTO blobs VALUES (?, ?, ?, ?, ?)",
+                    (digest, segment, offset, len(data), len(body)),
+                )
+            # A page served again with the same body counts as fetched now
+            self._db.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (url, digest) DO UPDATE SET"
+                " fetched_at = excluded.fetched_at,"
+                " headline = COALESCE(excluded.headline, headline)",
+                (url, digest, source, category, kind, headline, time.time()),
+            )
+            self._db.commit()
+        return digest
+
+    # Function to read back the body stored under a digest
+    def read(self, digest):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT segment, offset, length FROM blobs WHERE digest = ?",
+                (digest,),
+            ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length = row
+        with open(self._segment_path(segment), "rb") as segment_file:
+            segment_file.seek(offset)
+            data = segment_file.read(length)
+        return decompress(data, segment.rsplit(".", 1)[1])
+
+    # Function to get the digest of the latest archived version of a URL
+    def latest(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM pages WHERE url = ?"
+                " ORDER BY fetched_at DESC LIMIT 1",
+                (url,),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    # Function to list the (url, digest, headline) of every archived page
+    # of a section and kind, oldest first
+    def entries(self, source, category, kind):
+        with self._lock:
+            return self._db.execute(
+                "SELECT url, digest, headline FROM pages"
+                " WHERE source = ? AND category = ? AND kind = ?"
+                " ORDER BY fetched_at",
+                (source, category, kind),
+            ).fetchall()
+
+    # Function to record that the articles of `keys` were stored
+    def mark_stored(self, source, category, keys):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO stored VALUES (?, ?, ?)",
+                [(source, category, key) for key in keys],
+            )
+            self._db.commit()
+
+    # Function to get the keys of the stored articles of a section
+    def stored_keys(self, source, category):
+        with self._lock:
+            return {
+                key
+                for (key,) in self._db.execute(
+                    "SELECT key FROM stored WHERE source = ? AND category = ?",
+                    (source, category),
+                )
+            }
+
+    # Function to count pages and bodies and sum their raw and stored sizes
+    def stats(self):
+        with self._lock:
+            (pages,) = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()
+            blobs, size, length = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length), 0)"
+                " FROM blobs"
+            ).fetchone()
+        return {"pages": pages, "bodies": blobs, "bytes": size, "stored_bytes": length}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_archive = None
+_archive_enabled = True
+_archive_lock = threading.Lock()
+
+
+# Function to get the shared archive, or None when archiving is disabled
+def get_archive():
+    global _archive
+    with _archive_lock:
+        if _archive is None and _archive_enabled:
+            _archive = HtmlArchive()
+        return _archive
+
+
+# Function to point the shared archive at another directory or disable it
+def configure(directory=ARCHIVE_DIR, enabled=True):
+    global _archive, _archive_enabled
+    with _archive_lock:
+        previous = _archive
+        _archive_enabled = enabled
+        _archive = HtmlArchive(directory) if enabled else None
+    if previous is not None:
+        previous.close()
+    return _archive
+
+
+# Function to archive a fetched page in the shared archive, if enabled
+def add(url, body, source, category, kind, headline=None):
+    archive = get_archive()
+    if archive is not None:
+        archive.add(url, body, source, category, kind, headline)
+
+
+# Function to list the (url, digest, headline) of the archived pages of a
+# section and kind in the shared archive, oldest first
+def entries(source, category, kind):
+    archive = get_archive()
+    return archive.entries(source, category, kind) if archive is not None else []
+
+
+# Function to record the stored articles of a section in the shared
+# archive, if enabled
+def mark_stored(source, category, keys):
+    archive = get_archive()
+    if archive is not None and keys:
+        archive.mark_stored(source, category, keys)
+
+
+# Function to get the keys of the stored articles of a section in the
+# shared archive
+def stored_keys(source, category):
+    archive = get_archive()
+    return archive.stored_keys(source, category) if archive is not None else set()
+
+
+# Function to build a response object from an archived body
+def to_response(url, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body
+    return response
+
+
+# Function to list the pages of a section in the shared archive as
+# (url, response, headline), oldest first
+def iter_pages(source, category, kind):
+    archive = get_archive()
+    if archive is None:
+        return
+    for url, digest, headline in archive.entries(source, category, kind):
+        yield url, to_response(url, archive.read(digest)), headline
+
+
+# Function to answer a request from the shared archive instead of the
+# network: the latest archived version of the URL, or None when it was
+# never archived. Takes the crawl engine's fetch arguments.
+def fetch(url, **kwargs):
+    archive = get_archive()
+    digest = archive.latest(url) if archive is not None else None
+    if digest is None:
+        return None
+    return to_response(url, archive.read(digest))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show what the HTML archive holds")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    args = parser.parse_args()
+    stats = HtmlArchive(args.archive_dir).stats()
+    ratio = stats["bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0
+    print(
+        f"{stats['pages']} pages, {stats['bodies']} distinct bodies,"
+        f" {stats['bytes'] / 2**20:.1f} MB stored in"
+        f" {stats['stored_bytes'] / 2**20:.1f} MB ({ratio:.1f}x)"
+    )
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+import http_client
+
+# Directory holding cached bodies and the sqlite index
+CACHE_DIR = ".http_cache"
+
+# Total size of cached bodies before least recently used entries are evicted
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Seconds a cached page is served without asking the server again.
+# Listing pages change as new articles are published, articles rarely do.
+LISTING_TTL = 60 * 60
+ARTICLE_TTL = 7 * 24 * 60 * 60
+
+
+# Persistent response cache keyed by URL.
+# Bodies are stored as files named by the URL hash; an sqlite index keeps
+# the validators (ETag / Last-Modified), fetch and access times, body size
+# and the record last extracted from the body, so unchanged pages can be
+# answered from disk and skip parsing altogether.
+class ResponseCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "bodies"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                record TEXT
+            )
+            """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+        )
+        self._db.commit()
+
+    def _body_path(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "bodies", digest[:2], digest)
+
+    # Function to look up the index entry for a URL, marking it as used
+    def lookup(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, content_type, fetched_at FROM entries"
+                " WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self._db.commit()
+        etag, last_modified, content_type, fetched_at = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": content_type,
+            "fetched_at": fetched_at,
+        }
+
+    # Function to rebuild a response object from a cached body
+    def response(self, url, entry):
+        try:
+            with open(self._body_path(url), "rb") as body:
+                content = body.read()
+        except FileNotFoundError:
+            return None
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = content
+        if entry["content_type"]:
+            response.headers["Content-Type"] = entry["content_type"]
+        response.from_cache = True
+        response.cache_url = url
+        return response
+
+    # Function to store a fresh 200 response, dropping any stale record
+    def store(self, url, response):
+        path = self._body_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "wb") as body:
+            body.write(response.content)
+        os.replace(temporary_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, NULL)",
+                (
+                    url,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    response.headers.get("Content-Type"),
+                    now,
+                    now,
+                    len(response.content),
+                ),
+            )
+            self._db.commit()
+        self.evict()
+
+    # Function to mark a cached entry as revalidated by a 304 response
+    def refresh(self, url, response):
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET fetched_at = ?,"
+                " etag = COALESCE(?, etag),"
+                " last_modified = COALESCE(?, last_modified)"
+                " WHERE url = ?",
+                (
+                    time.time(),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    url,
+                ),
+            )
+            self._db.commit()
+
+    # Function to load the record previously extracted from a cached body
+    def load_record(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT record FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    # Function to remember the record extracted from the cached body
+    def save_record(self, url, record):
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET record = ? WHERE url = ?", (json.dumps(record), url)
+            )
+            self._db.commit()
+
+    # Function to evict least recently used entries until under the size limit
+    def evict(self):
+        with self._lock:
+            (total,) = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for url, size in self._db.execute(
+                "SELECT url, size FROM entries ORDER BY accessed_at"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                evicted.append(url)
+                total -= size
+            self._db.executemany(
+                "DELETE FROM entries WHERE url = ?", [(url,) for url in evicted]
+            )
+            self._db.commit()
+        for url in evicted:
+            try:
+                os.remove(self._body_path(url))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cache = None
+_cache_enabled = True
+_cache_lock = threading.Lock()
+
+
+# Function to get the shared cache, or None when caching is disabled
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None and _cache_enabled:
+            _cache = ResponseCache()
+        return _cache
+
+
+# Function to point the shared cache at another directory or disable it
+def configure(directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, enabled=True):
+    global _cache, _cache_enabled
+    with _cache_lock:
+        previous = _cache
+        _cache_enabled = enabled
+        _cache = ResponseCache(directory, max_bytes) if enabled else None
+    if previous is not None:
+        previous.close()
+    return _cache
+
+
+# Function to GET a URL through the cache.
+# Entries younger than `ttl` are served from disk without a request; older
+# ones are revalidated with If-None-Match / If-Modified-Since and reused on
+# 304. Responses served from disk carry `from_cache = True`.
+def cached_get(url, ttl=ARTICLE_TTL):
+    cache = get_cache()
+    if cache is None:
+        return http_client.get(url)
+
+    entry = cache.lookup(url)
+    headers = {}
+    if entry is not None:
+        if time.time() - entry["fetched_at"] < ttl:
+            cached = cache.response(url, entry)
+            if cached is not None:
+                return cached
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = http_client.get(url, headers=headers)
+    if response.status_code == 304 and entry is not None:
+        cache.refresh(url, response)
+        cached = cache.response(url, entry)
+        if cached is not None:
+            return cached
+        # The body went missing from disk; fetch it again unconditionally
+        response = http_client.get(url)
+
+    if response.status_code == 200:
+        cache.store(url, response)
+    response.from_cache = False
+    response.cache_url = url
+    return response
+
+
+# Function to load the record cached for a response that came from disk
+def load_record(response):
+    cache = get_cache()
+    if cache is None or not getattr(response, "from_cache", False):
+        return None
+    return cache.load_record(response.cache_url)
+
+
+# Function to remember the record extracted from a response
+def save_record(response, record):
+    cache = get_cache()
+    if cache is not None and hasattr(response, "cache_url"):
+        cache.save_record(response.cache_url, record)
@@ -0,0 +1,195 @@
+import email.utils
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentation
+import rate_limiter
+
+# (connect, read) timeout in seconds applied to every request
+DEFAULT_TIMEOUT = (10, 30)
+
+# Number of retries after the first attempt for transient failures
+MAX_RETRIES = 4
+
+# Base and cap, in seconds, of the exponential backoff between retries
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 60.0
+
+# Status codes that are worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Number of hosts and connections per host kept alive in the pool
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 16
+
+USER_AGENT = "Mozilla/5.0 (compatible; ML_project news scraper)"
+
+
+# Function to build a session that keeps TCP/TLS connections alive per host
+def create_session(pool_maxsize=POOL_MAXSIZE):
+    session = requests.Session()
+    # Retries are handled in get() so backoff and Retry-After stay in one place
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=0
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+_limiter = None
+_limiter_enabled = True
+
+
+# Function to get the shared session, creating it on first use
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+# Function to fetch a robots.txt over the shared pool, bypassing the rate
+# limiter that asks for it
+def fetch_robots(url):
+    return get_session().get(url, timeout=DEFAULT_TIMEOUT)
+
+
+# Function to build a rate limiter for the registry's hosts that honours
+# their robots.txt
+def create_limiter():
+    return rate_limiter.RateLimiter(
+        robots=rate_limiter.RobotsCache(fetch_robots, user_agent=USER_AGENT)
+    )
+
+
+# Function to get the shared rate limiter, or None when rate limiting is off
+def get_limiter():
+    global _limiter
+    with _session_lock:
+        if _limiter is None and _limiter_enabled:
+            _limiter = create_limiter()
+        return _limiter
+
+
+# Function to resize the shared connection pool, e.g. to match worker count,
+# and turn the per-host rate limits on or off
+def configure(pool_maxsize=POOL_MAXSIZE, rate_limit=True):
+    global _session, _limiter, _limiter_enabled
+    with _session_lock:
+        previous, _session = _session, create_session(pool_maxsize)
+        _limiter_enabled = rate_limit
+        _limiter = create_limiter() if rate_limit else None
+    if previous is not None:
+        previous.close()
+    return _session
+
+
+# Function to parse a Retry-After header given in seconds or as an HTTP date
+def parse_retry_after(value):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Function to compute how long to wait before the next attempt.
+# The server's Retry-After wins when present; otherwise "full jitter"
+# exponential backoff spreads retries from concurrent workers apart.
+def retry_delay(attempt, response=None):
+    if response is not None:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+# Function to record one request attempt when instrumentation is on: its
+# latency per host, its status (or network error) and any retry it causes
+def record_attempt(url, start, attempt, status, retrying, error=None):
+    seconds = time.perf_counter() - start
+    host = urlsplit(url).netloc
+    instrumentation.observe("fetch", seconds, host=host)
+    instrumentation.count("requests", host=host, status=status)
+    if retrying:
+        instrumentation.count("retries", host=host, reason=status)
+    instrumentation.event(
+        "fetch",
+        url=url,
+        status=status,
+        attempt=attempt,
+        ms=round(seconds * 1000, 1),
+        retrying=retrying,
+        error=error,
+    )
+
+
+# Function to GET a URL over the shared pool, retrying transient failures.
+# Every attempt first waits for the host's rate limit, and its status
+# adapts that limit. Returns the final response (which may still be an
+# error status) and raises requests.RequestException once network errors
+# exhaust the retries.
+def get(url, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, **kwargs):
+    session = get_session()
+    limiter = get_limiter()
+    instrumented = instrumentation.enabled()
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            delay = limiter.reserve(url)
+            if delay:
+                if instrumented:
+                    instrumentation.observe(
+                        "rate_wait", delay, host=urlsplit(url).netloc
+                    )
+                time.sleep(delay)
+
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as error:
+            if instrumented:
+                record_attempt(
+                    url, start, attempt, "error", attempt < max_retries, str(error)
+                )
+            if attempt == max_retries:
+                raise
+            time.sleep(retry_delay(attempt))
+            continue
+
+        retrying = response.status_code in RETRY_STATUSES and attempt < max_retries
+        if instrumented:
+            record_attempt(url, start, attempt, response.status_code, retrying)
+        if limiter is not None:
+            limiter.record(
+                url,
+                response.status_code,
+                (
+                    parse_retry_after(response.headers.get("Retry-After"))
+                    if response.status_code in rate_limiter.THROTTLE_STATUSES
+                    else None
+                ),
+            )
+        if not retrying:
+            return response
+
+        # Read the body so the connection goes back to the pool
+        response.content
+        time.sleep(retry_delay(attempt, response))
@@ -0,0 +1,255 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import model_store
+import predict
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Largest number of texts classified in one batch
+MAX_BATCH = 64
+
+# Seconds the first request of a batch waits for more requests to join it
+MAX_WAIT = 0.005
+
+# Number of recent requests the latency percentiles are computed over
+LATENCY_WINDOW = 10000
+
+
+# Request of one client waiting in the micro-batcher queue
+class PendingRequest:
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+# Latency and throughput counters of the server
+class ServerMetrics:
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.requests = 0
+        self.documents = 0
+        self.batches = 0
+        self.errors = 0
+
+    # Function to record one classified batch and the latency of its requests
+    def record_batch(self, pending, documents):
+        now = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.requests += len(pending)
+            self.documents += documents
+            self._latencies.extend(now - request.enqueued_at for request in pending)
+
+    # Function to record a batch that failed
+    def record_error(self, pending):
+        with self._lock:
+            self.errors += len(pending)
+
+    # Function to summarize the counters as a JSON-friendly dict
+    def snapshot(self, queue_depth):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            summary = {
+                "requests": self.requests,
+                "documents": self.documents,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_size": self.documents / self.batches if self.batches else 0,
+                "queue_depth": queue_depth,
+            }
+        for percentile in (50, 90, 99):
+            summary[f"latency_p{percentile}_ms"] = (
+                float(np.percentile(latencies, percentile)) if len(latencies) else None
+            )
+        return summary
+
+
+# Coalesces concurrent requests into micro-batches.
+# A single worker thread takes the oldest request off the queue, waits up
+# to `max_wait` seconds for more to arrive (or until `max_batch` texts are
+# collected), and classifies all of them with one featurizer transform and
+# one predict_proba per classifier. Under load the queue fills while a
+# batch is being classified, so batches grow without adding waiting time.
+class MicroBatcher:
+    def __init__(self, predictor, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.predictor = predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metrics = ServerMetrics()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Function to queue texts for classification, returning a Future of
+    # one prediction dict per text
+    def submit(self, texts):
+        request = PendingRequest(texts)
+        self._queue.put(request)
+        return request.future
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    # Function to collect the next batch, or None once closed
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            try:
+                request = self._queue.get(
+                    timeout=max(deadline - time.perf_counter(), 0)
+                )
+            except queue.Empty:
+                break
+            if request is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            texts = [text for request in batch for text in request.texts]
+            try:
+                predictions = self.predictor.predict_batch(texts)
+            except Exception as error:
+                self.metrics.record_error(batch)
+                for request in batch:
+                    request.future.set_exception(error)
+                continue
+
+            columns = list(predictions.columns)
+            rows = [
+                dict(zip(columns, values))
+                for values in zip(*(predictions[column].tolist() for column in columns))
+            ]
+            start = 0
+            for request in batch:
+                request.future.set_result(rows[start : start + len(request.texts)])
+                start += len(request.texts)
+            self.metrics.record_batch(batch, len(texts))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+# Local HTTP server classifying articles with the persisted models.
+# POST /predict with {"text": "..."} or {"texts": [...]} returns
+# {"predictions": [...]}, one dict of "<model>_label" and
+# "<model>_probability" values per text; GET /metrics returns the latency
+# percentiles, queue depth and counters.
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, batcher, host=HOST, port=PORT):
+        self.batcher = batcher
+        super().__init__((host, port), InferenceHandler)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            batcher = self.server.batcher
+            self._send_json(200, batcher.metrics.snapshot(batcher.queue_depth()))
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            texts = payload["texts"] if "texts" in payload else [payload["text"]]
+            if not isinstance(texts, list) or not texts:
+                raise ValueError("texts must be a non-empty list of strings")
+            if not all(isinstance(text, str) for text in texts):
+                raise ValueError("texts must be a non-empty list of strings")
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json(400, {"error": f"invalid request: {error}"})
+            return
+
+        try:
+            predictions = self.server.batcher.submit(texts).result()
+        except Exception as error:
+            self._send_json(500, {"error": str(error)})
+            return
+        self._send_json(200, {"predictions": predictions})
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the fake news classifiers over local HTTP"
+    )
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--models-dir", default=model_store.MODELS_DIR)
+    parser.add_argument("--version", help="model version (the current one by default)")
+    parser.add_argument(
+        "--model", action="append", help="only serve this classifier (repeatable)"
+    )
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=MAX_WAIT * 1000,
+        help="how long a request waits for others to batch with",
+    )
+    args = parser.parse_args()
+
+    predictor = predict.Predictor(args.version, args.models_dir, args.model)
+    batcher = MicroBatcher(predictor, args.max_batch, args.max_wait_ms / 1000)
+    server = InferenceServer(batcher, args.host, args.port)
+    print(f"Serving {', '.join(predictor.models)} on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
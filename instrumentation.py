@@ -0,0 +1,271 @@
+import bisect
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+
+# Upper bounds, in milliseconds, of the latency histogram buckets; slower
+# observations fall in a last, unbounded bucket
+BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_MS += (1000, 2000, 5000, 10000, 30000)
+
+
+# Latency histogram with fixed buckets, so observing is O(log buckets) and
+# memory stays constant however long the run. Quantiles are estimated as
+# the upper bound of the bucket they fall in, capped by the slowest
+# observation.
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds):
+        milliseconds = seconds * 1000
+        self.buckets[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.maximum = max(self.maximum, milliseconds)
+
+    # Function to estimate the `q` quantile in milliseconds
+    def quantile(self, q):
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    # Function to summarize the histogram as a JSON-friendly dict
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.maximum,
+            "buckets_ms": dict(
+                zip([str(bound) for bound in BUCKETS_MS] + ["inf"], self.buckets)
+            ),
+        }
+
+
+# Counters, latency histograms and structured log of one run.
+# Counters and histograms are keyed by a name and labels (e.g. source and
+# section); events are written as one JSON object per line to `log`.
+class Recorder:
+    def __init__(self, log=None):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._counters = defaultdict(int)
+        self._histograms = defaultdict(Histogram)
+        self._log = log
+        self._lock = threading.Lock()
+
+    # Function to build the key of a series; label values are kept as text
+    # so that e.g. HTTP statuses and "error" sort together
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+
+    def count(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] += amount
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._histograms[key].observe(seconds)
+
+    def event(self, name, **fields):
+        if self._log is None:
+            return
+        line = json.dumps(
+            dict(time=round(time.time(), 3), event=name, **fields), default=str
+        )
+        with self._lock:
+            self._log.write(line + "\n")
+            self._log.flush()
+
+    # Function to summarize the run as a JSON-friendly dict
+    def summary(self):
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                dict(histogram.snapshot(), name=name, labels=dict(labels))
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": time.perf_counter() - self._start,
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def close(self):
+        if self._log is not None and self._log not in (sys.stdout, sys.stderr):
+            self._log.close()
+
+
+# Context manager adding the duration of its block to a histogram
+class Timer:
+    __slots__ = ("recorder", "name", "labels", "start")
+
+    def __init__(self, recorder, name, labels):
+        self.recorder = recorder
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.observe(
+            self.name, time.perf_counter() - self.start, **self.labels
+        )
+        return False
+
+
+# Timer handed out while instrumentation is disabled
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = NullTimer()
+
+# Instrumentation is off unless a script turns it on; every function below
+# then returns after a single check
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+# Function to get the shared recorder, or None when instrumentation is off
+def get_recorder():
+    return _recorder
+
+
+# Function to turn instrumentation on or off. Structured events are
+# appended to `log_path` as JSON lines ("-" for stderr) when given.
+def configure(enabled=False, log_path=None):
+    global _recorder
+    log = None
+    if enabled and log_path:
+        log = sys.stderr if log_path == "-" else open(log_path, "a", encoding="utf-8")
+    with _recorder_lock:
+        previous, _recorder = _recorder, Recorder(log) if enabled else None
+    if previous is not None:
+        previous.close()
+    return _recorder
+
+
+# Function to check whether instrumentation is on
+def enabled():
+    return _recorder is not None
+
+
+# Function to add `amount` to a labelled counter
+def count(name, amount=1, **labels):
+    recorder = _recorder
+    if recorder is not None:
+        recorder.count(name, amount, **labels)
+
+
+# Function to add a duration in seconds to a labelled histogram
+def observe(name, seconds, **labels):
+    recorder = _recorder
+    if recorder is not None:
+        recorder.observe(name, seconds, **labels)
+
+
+# Function to time a block into a labelled histogram:
+#     with instrumentation.timer("parse", source=name): ...
+def timer(name, **labels):
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_TIMER
+    return Timer(recorder, name, labels)
+
+
+# Function to write one structured event to the log
+def event(name, **fields):
+    recorder = _recorder
+    if recorder is not None:
+        recorder.event(name, **fields)
+
+
+# Function to count a fetched page under `labels`: one "pages" count per
+# status ("error" when the request failed), its "bytes" and "cache_hits"
+def count_response(response, **labels):
+    recorder = _recorder
+    if recorder is None:
+        return
+    if response is None:
+        recorder.count("pages", status="error", **labels)
+        return
+    recorder.count("pages", status=response.status_code, **labels)
+    recorder.count("bytes", len(response.content), **labels)
+    if getattr(response, "from_cache", False):
+        recorder.count("cache_hits", **labels)
+
+
+# Function to summarize the run so far, or None when instrumentation is off
+def summary():
+    recorder = _recorder
+    return recorder.summary() if recorder is not None else None
+
+
+# Function to format a run summary as text tables
+def format_summary(summary):
+    def labels_text(labels):
+        return " ".join(f"{key}={value}" for key, value in labels.items())
+
+    lines = [f"Run summary ({summary['elapsed_seconds']:.1f}s)", ""]
+    lines.append(f"{'counter':<16}{'labels':<56}{'value':>12}")
+    for counter in summary["counters"]:
+        lines.append(
+            f"{counter['name']:<16}{labels_text(counter['labels']):<56}"
+            f"{counter['value']:>12}"
+        )
+    lines.append("")
+    lines.append(
+        f"{'timing':<16}{'labels':<40}{'count':>8}{'mean ms':>10}{'p50 ms':>9}"
+        f"{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    )
+    for histogram in summary["histograms"]:
+        lines.append(
+            f"{histogram['name']:<16}{labels_text(histogram['labels']):<40}"
+            f"{histogram['count']:>8}{histogram['mean_ms']:>10.1f}"
+            f"{histogram['p50_ms']:>9.1f}{histogram['p90_ms']:>9.1f}"
+            f"{histogram['p99_ms']:>9.1f}{histogram['max_ms']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+# Function to end the run: log the summary as a final event, print it and
+# optionally write it to `output_path` as JSON
+def report(output_path=None):
+    recorder = _recorder
+    if recorder is None:
+        return None
+    run_summary = recorder.summary()
+    recorder.event("summary", **run_summary)
+    print(format_summary(run_summary))
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as output:
+            json.dump(run_summary, output, indent=2, default=str)
+    return run_summary
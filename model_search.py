@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import classification_report
+from sklearn.model_selection import (
+    GridSearchCV,
+    HalvingGridSearchCV,
+    train_test_split,
+)
+from sklearn.pipeline import Pipeline
+
+import training
+
+# Directory where fitted featurizers are cached between candidates, folds
+# and runs
+CACHE_DIR = ".model_search_cache"
+
+FOLDS = 3
+
+# Vectorizer settings searched for every classifier
+FEATURE_GRID = {
+    "features__tfidf__ngram_range": [(1, 1), (1, 2)],
+    "features__tfidf__max_features": [5000, 20000],
+}
+
+# Classifier settings searched on top of FEATURE_GRID
+MODEL_GRIDS = {
+    "LR": {"classifier__C": [0.5, 1.0, 4.0]},
+    "DT": {"classifier__max_depth": [None, 50], "classifier__min_samples_leaf": [1, 2]},
+    "RF": {
+        "classifier__n_estimators": [50, 100],
+        "classifier__min_samples_leaf": [1, 2],
+    },
+}
+
+
+# Function to build the searched pipeline of one classifier. Its
+# featurizer is cached with joblib.Memory, so candidates that only differ
+# in classifier settings reuse the vectorized folds instead of refitting
+# the TF-IDF vectorizer.
+def build_pipeline(name, cache_dir=CACHE_DIR, n_jobs=None):
+    classifier = training.MODELS[name]()
+    if n_jobs is not None and "n_jobs" in classifier.get_params():
+        classifier.set_params(n_jobs=n_jobs)
+    return Pipeline(
+        [("features", training.build_featurizer()), ("classifier", classifier)],
+        memory=joblib.Memory(cache_dir, verbose=0) if cache_dir else None,
+    )
+
+
+# Function to run the cross-validated search of one classifier and score
+# its best candidate on the held-out split. Runs in a worker process.
+def search_model(
+    name,
+    x_train,
+    y_train,
+    x_test,
+    y_test,
+    halving=False,
+    folds=FOLDS,
+    cache_dir=CACHE_DIR,
+    n_jobs=None,
+    seed=training.SEED,
+):
+    start = time.perf_counter()
+    grid = dict(FEATURE_GRID, **MODEL_GRIDS[name])
+    pipeline = build_pipeline(name, cache_dir, n_jobs)
+    if halving:
+        search = HalvingGridSearchCV(pipeline, grid, cv=folds, random_state=seed)
+    else:
+        search = GridSearchCV(pipeline, grid, cv=folds)
+    search.fit(x_train, y_train)
+    predictions = search.best_estimator_.predict(x_test)
+    return {
+        "model": name,
+        "best_params": {
+            key: list(value) if isinstance(value, tuple) else value
+            for key, value in search.best_params_.items()
+        },
+        "cv_score": search.best_score_,
+        "candidates": len(search.cv_results_["params"]),
+        "seconds": time.perf_counter() - start,
+        "report": classification_report(y_test, predictions, output_dict=True),
+        "report_text": classification_report(y_test, predictions),
+    }
+
+
+# Function to search every chosen classifier family concurrently, one per
+# worker process. RandomForest additionally spreads its trees over
+# `forest_jobs` cores. Returns the results of each family.
+def search_all(
+    data,
+    names=None,
+    halving=False,
+    folds=FOLDS,
+    cache_dir=CACHE_DIR,
+    forest_jobs=None,
+    test_size=training.TEST_SIZE,
+    seed=training.SEED,
+):
+    names = names or list(training.MODELS)
+    x_train, x_test, y_train, y_test = train_test_split(
+        data["Content"], data["Label"], test_size=test_size, random_state=seed
+    )
+    with ProcessPoolExecutor(max_workers=len(names)) as executor:
+        futures = [
+            executor.submit(
+                search_model,
+                name,
+                x_train,
+                y_train,
+                x_test,
+                y_test,
+                halving,
+                folds,
+                cache_dir,
+                forest_jobs if name == "RF" else None,
+                seed,
+            )
+            for name in names
+        ]
+        return [future.result() for future in futures]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Search hyperparameters of the classifiers in parallel"
+    )
+    parser.add_argument("--fake", default=training.FAKE_CSV)
+    parser.add_argument("--true", default=training.TRUE_CSV)
+    parser.add_argument(
+        "--model",
+        action="append",
+        choices=list(training.MODELS),
+        help="only search this classifier (repeatable)",
+    )
+    parser.add_argument(
+        "--halving",
+        action="store_true",
+        help="successive halving instead of an exhaustive grid search",
+    )
+    parser.add_argument("--folds", type=int, default=FOLDS)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument(
+        "--no-cache", action="store_true", help="refit the featurizer every time"
+    )
+    parser.add_argument(
+        "--forest-jobs",
+        type=int,
+        default=max(1, (os.cpu_count() or 1) // 2),
+        help="cores RandomForest fits its trees on",
+    )
+    parser.add_argument("--report", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    data = training.load_corpus(args.fake, args.true)
+    start = time.perf_counter()
+    results = search_all(
+        data,
+        names=args.model,
+        halving=args.halving,
+        folds=args.folds,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        forest_jobs=args.forest_jobs,
+    )
+    wall_clock = time.perf_counter() - start
+
+    for result in results:
+        print(
+            f"{result['model']}: {result['candidates']} candidates in"
+            f" {result['seconds']:.1f}s, best CV accuracy {result['cv_score']:.4f}"
+        )
+        print(f"best parameters: {result['best_params']}")
+        print(result["report_text"])
+    sequential = sum(result["seconds"] for result in results)
+    print(
+        f"Wall-clock {wall_clock:.1f}s for {sequential:.1f}s of searches"
+        f" ({sequential / wall_clock:.1f}x from running them concurrently)"
+    )
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as report:
+            json.dump(
+                {
+                    "wall_clock_seconds": wall_clock,
+                    "results": [
+                        {k: v for k, v in result.items() if k != "report_text"}
+                        for result in results
+                    ],
+                },
+                report,
+                indent=2,
+            )
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import joblib
+from sklearn.pipeline import Pipeline
+
+# Directory holding one subdirectory per trained version
+MODELS_DIR = "models"
+
+# File naming the version loaded by default
+CURRENT_FILE = "CURRENT"
+
+MANIFEST_FILE = "manifest.json"
+
+FEATURIZER_FILE = "featurizer.joblib"
+
+
+# Versioned store of trained models.
+# A version is a directory holding the fitted featurizer (normalizer and
+# TF-IDF vectorizer), one file per classifier and a manifest describing how
+# they were trained. Files are written uncompressed so their arrays can be
+# memory-mapped when loaded, and CURRENT is only switched to a version once
+# all of its files are in place.
+#
+# Function to persist a fitted featurizer and classifiers as a new version
+def save(featurizer, models, manifest, directory=MODELS_DIR):
+    version = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, version)
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(directory, f"{version}-{suffix}")
+    version = os.path.basename(path)
+    os.makedirs(path)
+
+    joblib.dump(featurizer, os.path.join(path, FEATURIZER_FILE))
+    for name, model in models.items():
+        joblib.dump(model, os.path.join(path, f"{name}.joblib"))
+    manifest = dict(manifest, version=version, models=sorted(models))
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as output:
+        json.dump(manifest, output, indent=2)
+
+    current_path = os.path.join(directory, CURRENT_FILE)
+    with open(f"{current_path}.tmp", "w", encoding="utf-8") as current:
+        current.write(version)
+    os.replace(f"{current_path}.tmp", current_path)
+    return version
+
+
+# Function to name the version loaded by default, or None before training
+def current_version(directory=MODELS_DIR):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as current:
+            return current.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+# Function to read the manifest of a version (the current one by default)
+def load_manifest(version=None, directory=MODELS_DIR):
+    version = version or current_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"No trained models in {directory}")
+    with open(
+        os.path.join(directory, version, MANIFEST_FILE), encoding="utf-8"
+    ) as manifest:
+        return json.load(manifest)
+
+
+# Function to load a version (the current one by default).
+# Returns the featurizer, a dict of the chosen classifiers (all by default)
+# and the manifest. Arrays are memory-mapped read-only unless `mmap_mode`
+# is None, so loading does not copy the model weights.
+def load(version=None, directory=MODELS_DIR, names=None, mmap_mode="r"):
+    manifest = load_manifest(version, directory)
+    path = os.path.join(directory, manifest["version"])
+    featurizer = joblib.load(os.path.join(path, FEATURIZER_FILE), mmap_mode=mmap_mode)
+    models = {
+        name: joblib.load(os.path.join(path, f"{name}.joblib"), mmap_mode=mmap_mode)
+        for name in (names or manifest["models"])
+    }
+    return featurizer, models, manifest
+
+
+# Function to load a version as one ready-to-predict Pipeline per
+# classifier, all sharing the same featurizer
+def load_pipelines(version=None, directory=MODELS_DIR, names=None, mmap_mode="r"):
+    featurizer, models, _ = load(version, directory, names, mmap_mode)
+    return {
+        name: Pipeline([("features", featurizer), ("classifier", model)])
+        for name, model in models.items()
+    }
@@ -1,74 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import pandas as pd
 import os
-import re
 
+import crawl_engine
+import crawl_frontier
+import crawler
+import dataset_store
+import date_parser
+import dedup_index
+import html_archive
+import http_cache
+import instrumentation
+import parse_pool
+import text_normalizer
+from sources import SOURCES
 
-# Function to fetch data from The Hindu National(India) section
-def fetch_the_hindu_india():
-    url = "https://www.thehindu.com/news/national/"
-    return fetch_data_from_url(url, "India")
-
-
-# Function to fetch data from The Hindu Live section
-def fetch_the_hindu_live():
-    url = "https://www.thehindu.com/news/"
-    return fetch_data_from_url(url, "Live")
-
-
-# Function to fetch data from The Hindu World section
-def fetch_the_hindu_world():
-    url = "https://www.thehindu.com/news/international"
-    return fetch_data_from_url(url, "World")
-
-
-# Function to fetch data from The Hindu States section
-def fetch_the_hindu_state():
-    url = "https://www.thehindu.com/news/states"
-    return fetch_data_from_url(url, "States")
-
-
-# Function to fetch data from The Hindu Cities section
-def fetch_the_hindu_city():
-    url = "https://www.thehindu.com/news/cities"
-    return fetch_data_from_url(url, "Cities")
-
-
-# Function to fetch data from The Hindu Sport section
-def fetch_the_hindu_sport():
-    url = "https://www.thehindu.com/sport"
-    return fetch_data_from_url(url, "Sports")
-
-
-# Function to fetch data from The Hindu Technology section
-def fetch_the_hindu_technology():
-    url = "https://www.thehindu.com/sci-tech/technology"
-    return fetch_data_from_url(url, "Technology")
-
-
-# Function to fetch data from The Hindu Science section
-def fetch_the_hindu_science():
-    url = "https://www.thehindu.com/sci-tech/science"
-    return fetch_data_from_url(url, "Science")
-
-
-# Function to fetch data from The Hindu Education section
-def fetch_the_hindu_education():
-    url = "https://www.thehindu.com/education"
-    return fetch_data_from_url(url, "Education")
-
-
-# Function to fetch data from The Hindu Business section
-def fetch_the_hindu_business():
-    url = "https://www.thehindu.com/business"
-    return fetch_data_from_url(url, "Business")
-
-
-# Function to fetch data from The Hindu Entertainment section
-def fetch_the_hindu_entertainment():
-    url = "https://www.thehindu.com/entertainment"
-    return fetch_data_from_url(url, "Entertainment")
+CSV_PATH = "news_true.csv"
 
 
 # Function to clean and preprocess headlines and content
@@ -76,18 +23,8 @@ def clean_and_preprocess(text):
     if pd.isna(text):
         return text
 
-    # Remove extra whitespace
-    text = text.strip()
-
-    # Replace HTML entities and special characters
-    text = re.sub(r"&amp;", "&", text)
-    text = re.sub(r"&lt;", "<", text)
-    text = re.sub(r"&gt;", ">", text)
-    text = re.sub(r"&quot;", '"', text)
-    text = re.sub(r"&#039;", "'", text)
-    text = re.sub(r"\s+", " ", text)  # Replace multiple spaces with a single space
-
-    return text
+    # Remove extra whitespace and replace HTML entities
+    return text_normalizer.clean_text(text, typographic=False)
 
 
 # Function to remove float values from the DataFrame
@@ -96,165 +33,169 @@ def remove_floats(dataframe):
     return dataframe.applymap(lambda x: "" if isinstance(x, float) else x)
 
 
-# Helper function to fetch data from a given URL
-def fetch_data_from_url(url, category):
-    response = requests.get(url)
-    if response.status_code == 200:
-        html_content = response.content
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        headlines = []
-        links = []
-        categories = []
-        contents, publication_dates = [], []
-
-        for item in soup.find_all("h3", class_="title"):
-            headline_text = item.get_text().strip()
-            link = item.find("a").get("href")
-
-            if headline_text and link:
-                headlines.append(headline_text)
-                links.append(link if link.startswith("http") else url + link)
-                categories.append(category)  # Set label to the given label
-
-        for link in links:
-            article_response = requests.get(link)
-            if article_response.status_code == 200:
-                article_soup = BeautifulSoup(article_response.content, "html.parser")
-                article_body = article_soup.find("h2", class_="sub-title")
-                publication_date_element = article_soup.find(
-                    "p", class_="publish-time-new"
-                )
-
-                contents.append(
-                    article_body.get_text().strip()
-                    if article_body
-                    else "Content not found"
-                )
-
-                publication_date_span = (
-                    publication_date_element.find("span")
-                    if publication_date_element
-                    else None
-                )
-                publication_date_text = (
-                    publication_date_span.get_text().strip().replace("-", "")
-                    if publication_date_span
-                    else "Date not found"
-                )
-                # Extract only the date part from the publication date string
-                # Example format: "August 11, 2024 12:12 pm IST  Dhaka"
-                # We want only "August 11, 2024"
-                date_only = re.search(r"\w+ \d{1,2}, \d{4}", publication_date_text)
-                publication_dates.append(
-                    date_only.group() if date_only else "Date not found"
-                )
-            else:
-                contents.append("Failed to retrieve article")
-                publication_dates.append("Failed to retrieve date")
-
-        # Apply cleaning and preprocessing
-        headlines = [clean_and_preprocess(h) for h in headlines]
-        contents = [clean_and_preprocess(c) for c in contents]
-        dataframe = pd.DataFrame(
-            {
-                "Category": categories,
-                "Headline": headlines,
-                "Content": contents,
-                "Published Date": publication_dates,  # Change the column name here
-            }
+# Stream data from all sections into the dataset store, crawling the
+# sections concurrently
+def fetch_data(writer, names=None, categories=None, from_archive=False):
+    crawler.crawl_into(
+        writer,
+        clean_and_preprocess,
+        corpus="true",
+        names=names,
+        categories=categories,
+        from_archive=from_archive,
+    )
+
+
+# Function to bring rows of a news_true.csv written by an older version in
+# line with freshly crawled ones
+def normalize_existing_data(existing_data):
+    # Rename the "Publication Date" column in the existing data to "Published Date"
+    if "Publication Date" in existing_data.columns:
+        existing_data = existing_data.rename(
+            columns={"Publication Date": "Published Date"}
         )
 
-        # Remove float values from the dataframe
-        dataframe = remove_floats(dataframe)
-
-        return dataframe
-
-    else:
-        print(f"Failed to retrieve webpage from {url}")
-        return pd.DataFrame()
-
-
-# Combine data from all sections
-def fetch_data():
-    dataframes = [
-        fetch_the_hindu_india(),
-        fetch_the_hindu_live(),
-        fetch_the_hindu_world(),
-        fetch_the_hindu_state(),
-        fetch_the_hindu_city(),
-        fetch_the_hindu_sport(),
-        fetch_the_hindu_technology(),
-        fetch_the_hindu_science(),
-        fetch_the_hindu_education(),
-        fetch_the_hindu_business(),
-        fetch_the_hindu_entertainment(),
-    ]
-    return pd.concat(dataframes, ignore_index=True)
+    # Apply cleaning and preprocessing to existing data
+    existing_data["Headline"] = existing_data["Headline"].apply(clean_and_preprocess)
+    existing_data["Content"] = existing_data["Content"].apply(clean_and_preprocess)
 
+    # Ensure all existing data also has the true label
+    existing_data["Label"] = 1
 
-# Save data to CSV file without duplicates and without floats
-def save_data_to_csv(data):
-    file_path = "news_true.csv"
+    # Re-normalize the stored dates in one vectorized call: ISO dates written
+    # by compact() as well as the "August 11, 2024" dates of older versions
+    existing_data["Published Date"] = date_parser.normalize_column(
+        existing_data["Published Date"]
+    )
 
-    # Add a new column "Label" with the value True
-    data["Label"] = 1
+    # Remove float values from the existing data
+    return remove_floats(existing_data)[dataset_store.COLUMNS]
 
-    # Function to extract only the date from the published date
-    def extract_date_only(date_text):
-        date_only = re.search(r"\w+ \d{1,2}, \d{4}", date_text)
-        return date_only.group() if date_only else date_text
 
-    # Apply date extraction to the new data
-    data["Published Date"] = data["Published Date"].apply(extract_date_only)
+# Save data to CSV file without duplicates and without floats.
+# The dataset store is compacted into news_true.csv: de-duplicated by
+# headline and sorted by category without loading the corpus in memory.
+# Records re-extracted from the HTML archive win over the stored ones.
+def save_data_to_csv():
+    rows = dataset_store.compact("true", CSV_PATH, overrides=dataset_store.REBUILD_DIR)
+    print(f"Data saved to {CSV_PATH} ({rows} rows)")
 
-    if os.path.isfile(file_path):
-        existing_data = pd.read_csv(file_path)
 
-        # Rename the "Publication Date" column in the existing data to "Published Date"
-        if "Publication Date" in existing_data.columns:
-            existing_data.rename(
-                columns={"Publication Date": "Published Date"}, inplace=True
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape true news articles")
+    parser.add_argument("--workers", type=int, default=crawl_engine.DEFAULT_WORKERS)
+    parser.add_argument("--per-host", type=int, default=crawl_engine.DEFAULT_PER_HOST)
+    parser.add_argument(
+        "--parse-processes",
+        type=int,
+        default=parse_pool.DEFAULT_PROCESSES,
+        help="processes parsing and cleaning pages (0 parses on the fetching threads)",
+    )
+    parser.add_argument(
+        "--no-rate-limit",
+        action="store_true",
+        help="ignore the per-site request rates and robots.txt crawl-delay",
+    )
+    parser.add_argument("--archive-dir", default=html_archive.ARCHIVE_DIR)
+    parser.add_argument(
+        "--no-archive", action="store_true", help="do not archive the fetched pages"
+    )
+    parser.add_argument(
+        "--from-archive",
+        action="store_true",
+        help="re-extract the corpus from the archived pages without fetching",
+    )
+    parser.add_argument("--cache-dir", default=http_cache.CACHE_DIR)
+    parser.add_argument(
+        "--no-cache", action="store_true", help="fetch every page from the network"
+    )
+    parser.add_argument(
+        "--full-crawl",
+        action="store_true",
+        help="fetch every article instead of only the ones not seen before",
+    )
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="store articles even if they duplicate ones already ingested",
+    )
+    parser.add_argument(
+        "--source",
+        action="append",
+        choices=[
+            name for name, source in SOURCES.items() if source["corpus"] == "true"
+        ],
+        help="only crawl this source (repeatable)",
+    )
+    parser.add_argument(
+        "--category", action="append", help="only crawl this section (repeatable)"
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="print per-source counters and fetch/parse/clean latencies at the end",
+    )
+    parser.add_argument(
+        "--metrics-log",
+        help="append structured JSON events to this file ('-' for stderr);"
+        " implies --metrics",
+    )
+    parser.add_argument(
+        "--metrics-output",
+        help="write the end-of-run summary to this JSON file; implies --metrics",
+    )
+    args = parser.parse_args()
+    instrumentation.configure(
+        enabled=bool(args.metrics or args.metrics_log or args.metrics_output),
+        log_path=args.metrics_log,
+    )
+    crawl_engine.configure(
+        workers=args.workers,
+        per_host=args.per_host,
+        rate_limit=not args.no_rate_limit,
+    )
+    parse_pool.configure(args.parse_processes)
+    http_cache.configure(directory=args.cache_dir, enabled=not args.no_cache)
+    html_archive.configure(
+        directory=args.archive_dir, enabled=args.from_archive or not args.no_archive
+    )
+    crawl_frontier.configure(enabled=not args.full_crawl)
+    # Re-extraction only replays the articles the live crawls stored, which
+    # were de-duplicated then, so it checks nothing against the index
+    dedup_index.configure(enabled=not (args.keep_duplicates or args.from_archive))
+
+    if args.from_archive:
+        # Re-extracted records go to their own store, which wins when the
+        # CSV is compacted. Only the categories re-extracted now are
+        # replaced; the others keep their earlier re-extracted records.
+        try:
+            rebuilt = crawler.rebuild_categories("true", args.source, args.category)
+        except ValueError as error:
+            parser.error(str(error))
+        if args.source or args.category:
+            for category in rebuilt:
+                dataset_store.clear("true", dataset_store.REBUILD_DIR, category)
+        else:
+            dataset_store.clear("true", dataset_store.REBUILD_DIR)
+        with dataset_store.ShardWriter("true", dataset_store.REBUILD_DIR) as writer:
+            fetch_data(
+                writer, names=args.source, categories=args.category, from_archive=True
             )
-
-        # Apply cleaning and preprocessing to existing data
-        existing_data["Headline"] = existing_data["Headline"].apply(
-            clean_and_preprocess
-        )
-        existing_data["Content"] = existing_data["Content"].apply(clean_and_preprocess)
-
-        # Ensure all existing data also has Label set to True
-        existing_data["Label"] = True
-
-        # Apply date extraction to the existing data
-        existing_data["Published Date"] = existing_data["Published Date"].apply(
-            extract_date_only
-        )
-
-        # Remove float values from the existing data
-        existing_data = remove_floats(existing_data)
-
-        # Combine new data with existing data
-        combined_data = pd.concat([existing_data, data], ignore_index=True)
-
-        # Drop duplicates based on the "Headline" column
-        combined_data = combined_data.drop_duplicates(subset="Headline").reset_index(
-            drop=True
-        )
-
     else:
-        combined_data = data
-
-    # Remove float values from the combined data
-    combined_data = remove_floats(combined_data)
-
-    # Sort the combined data by the "Category" column
-    combined_data = combined_data.sort_values(by="Category").reset_index(drop=True)
-
-    combined_data.to_csv(file_path, index=False, encoding="utf-8-sig")
-    print("Data saved to news_true.csv")
-
+        # Seed the store once with the CSV written by earlier versions
+        if os.path.isfile(CSV_PATH) and not dataset_store.has_shards("true"):
+            dataset_store.import_csv("true", CSV_PATH, normalize_existing_data)
+
+        # A new de-duplication index starts from everything stored in both corpora
+        index = dedup_index.get_index()
+        if index is not None and index.is_empty():
+            for stored_corpus in ("true", "fake"):
+                dedup_index.add_records(
+                    stored_corpus, dataset_store.iter_records(stored_corpus)
+                )
 
-# Main execution
-combined_data = fetch_data()
-save_data_to_csv(combined_data)
+        with dataset_store.ShardWriter("true") as writer:
+            fetch_data(writer, names=args.source, categories=args.category)
+    save_data_to_csv()
+    instrumentation.report(args.metrics_output)
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# Number of parser processes the scrapers start by default: one core is
+# left to the fetching threads, and a single core parses inline
+DEFAULT_PROCESSES = max(0, (os.cpu_count() or 1) - 1)
+
+# Pages waiting for or in a parser process, per process, before the
+# threads handing pages over are made to wait
+PENDING_PER_PROCESS = 4
+
+
+# Function run once in every parser process so the first page it parses
+# does not also pay for importing the parsing modules
+def _warm_up():
+    import crawler  # noqa: F401
+
+    return os.getpid()
+
+
+# Pool of parser processes fed through a bounded queue.
+# Fetcher threads hand over raw HTML bytes with submit() and get a Future
+# of the compact record back, so CPU-bound parsing runs outside the GIL
+# while the threads go back to the network. At most `max_pending` pages
+# are queued or being parsed; beyond that submit() blocks, which slows the
+# fetchers down to the pace of the parsers instead of piling up pages in
+# memory. Workers are spawned rather than forked, since the crawl runs
+# threads that a forked child would inherit mid-operation.
+class ParsePool:
+    def __init__(self, processes=DEFAULT_PROCESSES, max_pending=None):
+        self.processes = processes
+        self.max_pending = max_pending or processes * PENDING_PER_PROCESS
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # Start every process now rather than on the first pages
+        for future in [self._executor.submit(_warm_up) for _ in range(processes)]:
+            future.result()
+
+    def _release(self, future):
+        self._slots.release()
+
+    # Function to run `function(*args)` in a parser process, blocking while
+    # the queue is full. Returns a Future of the result.
+    def submit(self, function, *args):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Function to get the shared pool, or None when pages are parsed inline
+def get_pool():
+    return _pool
+
+
+# Function to start the shared pool with `processes` parser processes, or
+# to parse pages inline on the fetching threads with 0
+def configure(processes=DEFAULT_PROCESSES, max_pending=None):
+    global _pool
+    with _pool_lock:
+        previous = _pool
+        _pool = ParsePool(processes, max_pending) if processes > 0 else None
+    if previous is not None:
+        previous.close()
+    return _pool
+
+
+# Function to run `function(*args)` in the shared pool, or right away on
+# the calling thread when there is none. Returns a Future either way.
+def submit(function, *args):
+    pool = _pool
+    if pool is not None:
+        return pool.submit(function, *args)
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except BaseException as error:
+        future.set_exception(error)
+    return future
+
+
+# Function to run `function(*args)` in the shared pool and wait for it
+def run(function, *args):
+    return submit(function, *args).result()
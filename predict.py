@@ -0,0 +1,147 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import model_store
+
+# Number of articles vectorized and classified at once by the CLI
+CHUNK_SIZE = 1000
+
+# Column holding the article text in the scraped datasets
+TEXT_COLUMN = "Content"
+
+LABELS = {0: "Fake News", 1: "True News"}
+
+
+# Classifiers of one persisted version sharing a single featurizer.
+# A batch is normalized and vectorized once and every classifier runs on
+# the same sparse matrix; the label is read off the class probabilities so
+# each classifier evaluates a batch only once.
+class Predictor:
+    def __init__(self, version=None, directory=model_store.MODELS_DIR, names=None):
+        self.featurizer, self.models, self.manifest = model_store.load(
+            version, directory, names
+        )
+
+    # Function to classify a batch of texts with the chosen classifiers (all
+    # by default). Returns a DataFrame with a "<name>_label" column (0 for
+    # fake, 1 for true) and a "<name>_probability" column (of being true)
+    # per classifier.
+    def predict_batch(self, texts, names=None):
+        index = texts.index if isinstance(texts, pd.Series) else None
+        features = self.featurizer.transform(texts)
+        columns = {}
+        for name in names or self.models:
+            model = self.models[name]
+            probabilities = model.predict_proba(features)
+            columns[f"{name}_label"] = model.classes_.take(
+                np.argmax(probabilities, axis=1)
+            )
+            columns[f"{name}_probability"] = probabilities[
+                :, list(model.classes_).index(1)
+            ]
+        return pd.DataFrame(columns, index=index)
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+# Function to get the shared predictor of the current version
+def get_predictor():
+    global _predictor
+    with _predictor_lock:
+        if _predictor is None:
+            _predictor = Predictor()
+        return _predictor
+
+
+# Function to load another version, or models from another directory, as
+# the shared predictor
+def configure(version=None, directory=model_store.MODELS_DIR, names=None):
+    global _predictor
+    with _predictor_lock:
+        _predictor = Predictor(version, directory, names)
+    return _predictor
+
+
+# Function to classify a batch of texts with the shared predictor
+def predict_batch(texts, names=None):
+    return get_predictor().predict_batch(texts, names)
+
+
+# Function to read a CSV or JSONL file of articles in chunks
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    if path.endswith((".jsonl", ".json")):
+        return pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    return pd.read_csv(path, chunksize=chunk_size, encoding="utf-8-sig")
+
+
+# Function to append a chunk of predictions to a CSV or JSONL file
+def write_chunk(path, chunk, first):
+    if path.endswith((".jsonl", ".json")):
+        with open(path, "w" if first else "a", encoding="utf-8") as output:
+            chunk.to_json(output, orient="records", lines=True, force_ascii=False)
+    else:
+        chunk.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+
+# Function to classify every article of `input_path` into `output_path`,
+# one chunk at a time so memory stays bounded by the chunk size.
+# Returns the number of classified articles.
+def predict_file(
+    input_path,
+    output_path,
+    predictor=None,
+    names=None,
+    chunk_size=CHUNK_SIZE,
+    text_column=TEXT_COLUMN,
+):
+    predictor = predictor if predictor is not None else get_predictor()
+    documents = 0
+    start = time.perf_counter()
+    for chunk in read_chunks(input_path, chunk_size):
+        texts = chunk[text_column].fillna("").astype(str)
+        predictions = predictor.predict_batch(texts, names)
+        write_chunk(output_path, chunk.join(predictions), first=documents == 0)
+        documents += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"{documents} documents, {documents / elapsed:.0f} docs/s")
+    return documents
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Classify a CSV or JSONL file of articles as true or fake news"
+    )
+    parser.add_argument("input", help="CSV or JSONL file of articles")
+    parser.add_argument(
+        "output", help="CSV or JSONL file receiving the articles and predictions"
+    )
+    parser.add_argument("--models-dir", default=model_store.MODELS_DIR)
+    parser.add_argument("--version", help="model version (the current one by default)")
+    parser.add_argument(
+        "--model", action="append", help="only run this classifier (repeatable)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--text-column", default=TEXT_COLUMN)
+    args = parser.parse_args()
+
+    predictor = Predictor(args.version, args.models_dir, args.model)
+    start = time.perf_counter()
+    documents = predict_file(
+        args.input,
+        args.output,
+        predictor,
+        chunk_size=args.chunk_size,
+        text_column=args.text_column,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"Classified {documents} documents in {elapsed:.1f}s"
+        f" ({documents / elapsed:.0f} docs/s) with"
+        f" {', '.join(predictor.models)} into {args.output}"
+    )
@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+import instrumentation
+from sources import SOURCES
+
+# Directory holding the last robots.txt fetched from every host, read back
+# when the host cannot be reached
+ROBOTS_DIR = os.path.join(".crawl_state", "robots")
+
+# Seconds a stored robots.txt is used without fetching it again
+ROBOTS_TTL = 24 * 60 * 60
+
+# Requests a host may receive back to back before its rate applies
+BURST = 2
+
+# Statuses telling us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+# Additive increase / multiplicative decrease of a host's rate: it is
+# halved on every throttling response, and after INCREASE_AFTER successes
+# in a row it grows by INCREASE_STEP requests per second, up to its limit
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.25
+INCREASE_AFTER = 20
+
+# Seconds during which further throttling answers, to requests that were
+# already in flight, do not lower the rate again
+DECREASE_WINDOW = 1.0
+
+# Lowest rate, in requests per second, throttling may bring a host down to
+MIN_RATE = 1 / 60
+
+
+# Function to map every host of the registry to the rate of its source
+def host_rates(sources=SOURCES):
+    rates = {}
+    for source in sources.values():
+        if "rate" not in source:
+            continue
+        for section in source["sections"]:
+            host = urlsplit(section["url"]).netloc
+            rates[host] = min(rates.get(host, source["rate"]), source["rate"])
+    return rates
+
+
+# Token bucket of one host whose rate adapts to the host's answers.
+# reserve() takes a token and returns how long the caller must wait before
+# using it; tokens may go negative, which queues concurrent callers behind
+# each other instead of letting them all retry at once.
+class TokenBucket:
+    def __init__(self, rate, burst=BURST):
+        self.limit = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.successes = 0
+        self._updated = time.monotonic()
+        self._decreased_at = None
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    # Function to halve the rate, and with a Retry-After hold every caller
+    # back for `pause` seconds
+    def throttle(self, pause=None):
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self._decreased_at is None
+                or now - self._decreased_at >= DECREASE_WINDOW
+            ):
+                self.rate = max(MIN_RATE, self.rate * DECREASE_FACTOR)
+                self._decreased_at = now
+            self.successes = 0
+            if pause:
+                self.tokens = min(self.tokens, -pause * self.rate)
+            return self.rate
+
+    # Function to count a success, returning the new rate when it grew
+    def succeed(self):
+        with self._lock:
+            self.successes += 1
+            if self.successes < INCREASE_AFTER or self.rate >= self.limit:
+                return None
+            self.successes = 0
+            self.rate = min(self.limit, self.rate + INCREASE_STEP)
+            return self.rate
+
+
+# Crawl-delay rules of every host, read from its robots.txt.
+# Each robots.txt is stored under `directory` once fetched; the stored copy
+# is used for ROBOTS_TTL seconds, and beyond that whenever the host cannot
+# be reached, so an offline run still honours the last known rules.
+# `fetch(url)` returns a response and must not go through the rate limiter.
+class RobotsCache:
+    def __init__(self, fetch, user_agent="*", directory=ROBOTS_DIR, ttl=ROBOTS_TTL):
+        self.fetch = fetch
+        self.user_agent = user_agent
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, host):
+        return os.path.join(self.directory, host.replace(":", "_") + ".txt")
+
+    # Function to get the robots.txt text of a host ("" when it has none),
+    # or None when it is unknown
+    def text(self, scheme, host):
+        path = self._path(host)
+        if os.path.isfile(path) and time.time() - os.path.getmtime(path) < self.ttl:
+            with open(path, encoding="utf-8") as stored:
+                return stored.read()
+
+        text = None
+        try:
+            response = self.fetch(f"{scheme}://{host}/robots.txt")
+            if response.status_code == 200:
+                text = response.text
+            elif 400 <= response.status_code < 500:
+                # No robots.txt means no rules
+                text = ""
+        except requests.RequestException as error:
+            print(f"Could not fetch robots.txt of {host}: {error}")
+
+        if text is None:
+            if not os.path.isfile(path):
+                return None
+            with open(path, encoding="utf-8") as stored:
+                return stored.read()
+
+        os.makedirs(self.directory, exist_ok=True)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as stored:
+            stored.write(text)
+        os.replace(temporary_path, path)
+        return text
+
+    # Function to get the seconds to leave between requests to a host, or
+    # None when its robots.txt sets no Crawl-delay or Request-rate
+    def delay(self, scheme, host):
+        text = self.text(scheme, host)
+        if not text:
+            return None
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        # The rules count as unread until a modification time is set
+        parser.modified()
+        delays = []
+        crawl_delay = parser.crawl_delay(self.user_agent)
+        if crawl_delay:
+            delays.append(float(crawl_delay))
+        request_rate = parser.request_rate(self.user_agent)
+        if request_rate and request_rate.requests:
+            delays.append(request_rate.seconds / request_rate.requests)
+        return max(delays) if delays else None
+
+
+# Per-host scheduler keeping every host within its own rate.
+# A host's limit is the rate of its source (see sources.py), lowered to
+# its robots.txt crawl-delay; hosts with neither are not limited. Within
+# that limit the rate follows the host's answers: 429/503 halve it (and a
+# Retry-After pauses the host), sustained success brings it back up. Each
+# host has its own bucket, so waiting on a slow host never delays others.
+class RateLimiter:
+    def __init__(self, rates=None, robots=None):
+        self.rates = host_rates() if rates is None else rates
+        self.robots = robots
+        self._buckets = {}
+        self._host_locks = {}
+        self._lock = threading.Lock()
+
+    def _create(self, scheme, host):
+        rate = self.rates.get(host)
+        burst = BURST
+        delay = self.robots.delay(scheme, host) if self.robots is not None else None
+        if delay:
+            rate = min(rate, 1 / delay) if rate else 1 / delay
+            burst = 1
+        if rate is None:
+            return None
+        instrumentation.event("rate_limit", host=host, rate=rate, crawl_delay=delay)
+        return TokenBucket(rate, burst)
+
+    # Function to get the bucket of a URL's host, or None if unlimited.
+    # The first request to a host reads its robots.txt; other requests to
+    # that host wait for it, requests to other hosts do not.
+    def bucket(self, url):
+        parts = urlsplit(url)
+        host = parts.netloc
+        if host in self._buckets:
+            return self._buckets[host]
+        with self._lock:
+            host_lock = self._host_locks.setdefault(host, threading.Lock())
+        with host_lock:
+            if host not in self._buckets:
+                self._buckets[host] = self._create(parts.scheme, host)
+        return self._buckets[host]
+
+    # Function to take a token for a request to `url`, returning the seconds
+    # to wait before sending it
+    def reserve(self, url):
+        bucket = self.bucket(url)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    # Function to adapt the host's rate to the status of a response.
+    # `retry_after` is the pause in seconds the host asked for, if any.
+    def record(self, url, status, retry_after=None):
+        bucket = self.bucket(url)
+        if bucket is None:
+            return
+        host = urlsplit(url).netloc
+        if status in THROTTLE_STATUSES:
+            rate = bucket.throttle(retry_after)
+            instrumentation.count("throttled", host=host, status=status)
+            instrumentation.event(
+                "rate_change", host=host, rate=rate, status=status, pause=retry_after
+            )
+        elif status < 400:
+            rate = bucket.succeed()
+            if rate is not None:
+                instrumentation.event("rate_change", host=host, rate=rate)
+
+    # Function to get the current rate of every limited host
+    def snapshot(self):
+        return {
+            host: bucket.rate
+            for host, bucket in list(self._buckets.items())
+            if bucket is not None
+        }
@@ -0,0 +1,194 @@
+import argparse
+import copy
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import VotingClassifier
+from sklearn.frozen import FrozenEstimator
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+import model_store
+import text_normalizer
+import training
+
+# Share of the training rows held back to calibrate the ensemble members
+CALIBRATION_SIZE = 0.2
+
+# Trees kept when pruning the forest
+PRUNED_TREES = 20
+
+# Documents classified one at a time to measure serving latency
+LATENCY_DOCUMENTS = 200
+
+
+# Function to combine fitted LR/DT/RF into a soft-voting ensemble. Every
+# member is calibrated with a sigmoid on held-back rows first, so the
+# averaged probabilities are comparable between members (a fully grown
+# decision tree only ever outputs 0 or 1).
+def build_ensemble(models, x_calibration, y_calibration):
+    calibrated = [
+        (
+            name,
+            FrozenEstimator(
+                CalibratedClassifierCV(FrozenEstimator(model), method="sigmoid").fit(
+                    x_calibration, y_calibration
+                )
+            ),
+        )
+        for name, model in models.items()
+    ]
+    return VotingClassifier(calibrated, voting="soft").fit(x_calibration, y_calibration)
+
+
+# Function to prune a fitted forest down to its first `trees` trees. The
+# trees are independent, so a prefix of them is itself a smaller forest.
+def prune_forest(forest, trees=PRUNED_TREES):
+    pruned = copy.deepcopy(forest)
+    pruned.estimators_ = pruned.estimators_[:trees]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+
+# Function to distill a teacher into a logistic regression trained on the
+# teacher's probabilities. Every row is fed twice, once per class, weighted
+# by the teacher's probability of that class, which fits the student to
+# the soft targets with an ordinary classifier.
+def distill(teacher, features):
+    probabilities = teacher.predict_proba(features)[:, list(teacher.classes_).index(1)]
+    rows = features.shape[0]
+    student = LogisticRegression(max_iter=1000)
+    student.fit(
+        sp.vstack([features, features]),
+        np.concatenate([np.ones(rows, dtype=int), np.zeros(rows, dtype=int)]),
+        sample_weight=np.concatenate([probabilities, 1 - probabilities]),
+    )
+    return student
+
+
+# Function to measure the pickled size, cold load time, per-document
+# latency and batch throughput of a model on the test features
+def measure(model, features, documents=LATENCY_DOCUMENTS):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model.joblib")
+        joblib.dump(model, path)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        joblib.load(path, mmap_mode="r")
+        load_seconds = time.perf_counter() - start
+
+    rows = min(documents, features.shape[0])
+    start = time.perf_counter()
+    for row in range(rows):
+        model.predict_proba(features[row])
+    latency = (time.perf_counter() - start) / rows
+
+    start = time.perf_counter()
+    model.predict_proba(features)
+    batch = (time.perf_counter() - start) / features.shape[0]
+    return {
+        "size_bytes": size,
+        "load_seconds": load_seconds,
+        "latency_ms": latency * 1000,
+        "batch_us_per_doc": batch * 1e6,
+    }
+
+
+# Function to train the serving candidates next to the notebook's LR/DT/RF
+# and report size, load time and latency against the accuracy lost
+# relative to the 100-tree forest. Returns the featurizer, every model and
+# the report rows.
+def compare(data, trees=PRUNED_TREES, seed=training.SEED):
+    x_train, x_test, y_train, y_test = train_test_split(
+        data["Content"], data["Label"], test_size=training.TEST_SIZE, random_state=seed
+    )
+    x_fit, x_calibration, y_fit, y_calibration = train_test_split(
+        x_train, y_train, test_size=CALIBRATION_SIZE, random_state=seed
+    )
+    featurizer = training.build_featurizer()
+    fit_features = featurizer.fit_transform(x_fit)
+    calibration_features = featurizer.transform(x_calibration)
+    test_features = featurizer.transform(x_test)
+
+    models = {
+        name: factory().fit(fit_features, y_fit)
+        for name, factory in training.MODELS.items()
+    }
+    models["ENSEMBLE"] = build_ensemble(
+        {name: models[name] for name in ("LR", "DT", "RF")},
+        calibration_features,
+        y_calibration,
+    )
+    models["RF_PRUNED"] = prune_forest(models["RF"], trees)
+    models["DISTILLED"] = distill(models["ENSEMBLE"], fit_features)
+
+    baseline = accuracy_score(y_test, models["RF"].predict(test_features))
+    report = []
+    for name, model in models.items():
+        accuracy = accuracy_score(y_test, model.predict(test_features))
+        report.append(
+            dict(
+                measure(model, test_features),
+                model=name,
+                accuracy=accuracy,
+                accuracy_lost=baseline - accuracy,
+            )
+        )
+    return featurizer, models, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build compact serving models and compare them with the forest"
+    )
+    parser.add_argument("--fake", default=training.FAKE_CSV)
+    parser.add_argument("--true", default=training.TRUE_CSV)
+    parser.add_argument("--trees", type=int, default=PRUNED_TREES)
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="persist every model as a new version in --models-dir",
+    )
+    parser.add_argument("--models-dir", default=model_store.MODELS_DIR)
+    args = parser.parse_args()
+
+    data = training.load_corpus(args.fake, args.true)
+    featurizer, models, report = compare(data, trees=args.trees)
+
+    print(
+        f"{'model':<12}{'size KB':>10}{'load ms':>9}{'latency ms':>12}"
+        f"{'batch us/doc':>14}{'accuracy':>10}{'lost':>8}"
+    )
+    for row in report:
+        print(
+            f"{row['model']:<12}{row['size_bytes'] / 1024:>10.0f}"
+            f"{row['load_seconds'] * 1000:>9.1f}{row['latency_ms']:>12.2f}"
+            f"{row['batch_us_per_doc']:>14.1f}{row['accuracy']:>10.4f}"
+            f"{row['accuracy_lost']:>8.4f}"
+        )
+
+    if args.save:
+        version = model_store.save(
+            featurizer,
+            models,
+            {
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "sklearn_version": sklearn.__version__,
+                "normalizer_version": text_normalizer.NORMALIZER_VERSION,
+                "data": {
+                    args.fake: training.file_digest(args.fake),
+                    args.true: training.file_digest(args.true),
+                },
+                "pruned_trees": args.trees,
+                "serving_report": report,
+            },
+            directory=args.models_dir,
+        )
+        print(f"Saved models as version {version} in {args.models_dir}")
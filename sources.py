@@ -0,0 +1,174 @@
+# Registry of every scraped source.
+# Each source declares the corpus it feeds ("true" or "fake") and the label
+# its rows get, how its listing pages are paginated ("page_url" is only
+# needed for sections with "max_pages" above 1), the selectors of its
+# listing and article pages (see extraction.py), how its dates are written
+# (see date_parser.py), the requests per second its site tolerates ("rate",
+# see rate_limiter.py) and its sections. Sources without an "article" page
+# type take every field straight from the listing page.
+# Adding a source or section only needs a new entry here.
+SOURCES = {
+    "the_hindu": {
+        "corpus": "true",
+        "label": 1,
+        "rate": 4.0,
+        "first_page_url": "{url}",
+        "listing": {
+            "parse_only": ["h3"],
+            "item": "h3.title",
+            "fields": {"headline": None, "link": ("a", "href")},
+        },
+        "article": {
+            "parse_only": ["h2", "p"],
+            "fields": {
+                "content": "h2.sub-title",
+                "date": "p.publish-time-new span",
+            },
+        },
+        # Example format: "August 11, 2024 12:12 pm IST - Dhaka"
+        # We want only "August 11, 2024"
+        "date": {
+            "remove": "-",
+            "pattern": r"\w+ \d{1,2}, \d{4}",
+            "formats": ["%B %d, %Y", "%b %d, %Y"],
+        },
+        "sections": [
+            {"category": "India", "url": "https://www.thehindu.com/news/national/"},
+            {"category": "Live", "url": "https://www.thehindu.com/news/"},
+            {"category": "World", "url": "https://www.thehindu.com/news/international"},
+            {"category": "States", "url": "https://www.thehindu.com/news/states"},
+            {"category": "Cities", "url": "https://www.thehindu.com/news/cities"},
+            {"category": "Sports", "url": "https://www.thehindu.com/sport"},
+            {
+                "category": "Technology",
+                "url": "https://www.thehindu.com/sci-tech/technology",
+            },
+            {"category": "Science", "url": "https://www.thehindu.com/sci-tech/science"},
+            {"category": "Education", "url": "https://www.thehindu.com/education"},
+            {"category": "Business", "url": "https://www.thehindu.com/business"},
+            {
+                "category": "Entertainment",
+                "url": "https://www.thehindu.com/entertainment",
+            },
+        ],
+    },
+    "boom_live": {
+        "corpus": "fake",
+        "label": "0",
+        "rate": 2.0,
+        "first_page_url": "{url}",
+        "page_url": "{url}/page/{page}",
+        "listing": {
+            "parse_only": ["h4"],
+            "item": "h4.font-alt.normal",
+            "fields": {"headline": None, "link": ("a.heading_link", "href")},
+        },
+        "article": {
+            "parse_only": ["p", "span"],
+            "fields": {"content": "p", "date": "span.convert-to-localtime"},
+        },
+        "date": {
+            "formats": [
+                "%d %b %Y %I:%M %p GMT",
+                "%d %B %Y %I:%M %p GMT",
+                "%d %b %Y %H:%M %p GMT",
+                "%d %B %Y %H:%M %p GMT",
+            ]
+        },
+        "sections": [
+            {
+                "category": "India",
+                "url": "https://www.boomlive.in/India",
+                "max_pages": 8,
+            },
+        ],
+    },
+    "natural_news": {
+        "corpus": "fake",
+        "label": "0",
+        "rate": 1.0,
+        "first_page_url": "{url}",
+        "page_url": "{url}page/{page}/",
+        "listing": {
+            "parse_only": ("div", {"class": "Text"}),
+            "item": "div.Text",
+            "fields": {
+                "headline": "div.Headline",
+                "content": "div.Description",
+                "date": "div.Date",
+                "link": ("div.Headline a", "href"),
+            },
+        },
+        # Example format: "08/11/2024 / By Ethan Huff"
+        "date": {
+            "split": r"/ By",
+            "formats": [
+                "%B %d, %Y",
+                "%m-%d-%Y",
+                "%m/%d/%Y",
+                "%b %d, %Y",
+                "%d %b %Y",
+                "%d %B %Y",
+            ],
+        },
+        "sections": [
+            {
+                "category": "Science",
+                "url": "https://www.naturalnews.com/category/science/",
+                "max_pages": 29,
+            },
+            {
+                "category": "Technology",
+                "url": "https://www.naturalnews.com/category/technology/",
+                "max_pages": 29,
+            },
+        ],
+    },
+    "fauxy": {
+        "corpus": "fake",
+        "label": "0",
+        "rate": 1.0,
+        "first_page_url": "{url}/page/1",
+        "page_url": "{url}/page/{page}",
+        "listing": {
+            "parse_only": ["h2"],
+            "item": "h2.entry-title",
+            "fields": {"headline": None, "link": ("a", "href")},
+        },
+        "article": {
+            "parse_only": ["p", "li"],
+            "fields": {
+                "content": "p",
+                "date": ("li.meta-updated-date time", "datetime"),
+            },
+        },
+        "date": {"iso": True},
+        "sections": [
+            {
+                "category": "Business",
+                "url": "https://thefauxy.com/business",
+                "max_pages": 13,
+            },
+            {
+                "category": "Sports",
+                "url": "https://thefauxy.com/sports",
+                "max_pages": 12,
+            },
+            {
+                "category": "Entertainment",
+                "url": "https://thefauxy.com/entertainment",
+                "max_pages": 15,
+            },
+            {
+                "category": "Politics",
+                "url": "https://thefauxy.com/politics",
+                "max_pages": 15,
+            },
+            {
+                "category": "World",
+                "url": "https://thefauxy.com/global",
+                "max_pages": 15,
+            },
+        ],
+    },
+}
@@ -0,0 +1,309 @@
+import argparse
+import time
+import tracemalloc
+import zlib
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import confusion_matrix
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+
+import corpus_loader
+import model_store
+import text_normalizer
+import training
+
+# Hashed feature space; collisions are rare at this size for unigrams and
+# bigrams of news text, and the IDF and model weights stay a few MB
+N_FEATURES = 2**20
+
+# Number of rows read from each CSV at a time
+CHUNK_SIZE = 2000
+
+# Passes over the training rows
+EPOCHS = 3
+
+# Rows are held out by a hash of their content, so the split is the same
+# whatever the chunking, and without keeping any list of test rows
+TEST_PERCENT = 30
+
+CLASSES = np.array([0, 1])
+
+# Classifiers trained incrementally with partial_fit
+MODELS = {
+    "SGD": partial(SGDClassifier, loss="log_loss", alpha=1e-6, random_state=42),
+    "NB": partial(MultinomialNB, alpha=0.01),
+}
+
+
+# Function to build the stateless featurizer: the notebook's wordopt
+# normalization, feature hashing instead of a fitted vocabulary, and an
+# IDF weighting whose document frequencies are counted by fit_idf()
+def build_featurizer(n_features=N_FEATURES, ngram_range=training.NGRAM_RANGE):
+    return Pipeline(
+        [
+            ("normalize", FunctionTransformer(text_normalizer.wordopt_batch)),
+            (
+                "hashing",
+                HashingVectorizer(
+                    n_features=n_features,
+                    ngram_range=ngram_range,
+                    alternate_sign=False,
+                    norm=None,
+                ),
+            ),
+            ("tfidf", TfidfTransformer()),
+        ]
+    )
+
+
+# Function to stream Content/Label chunks alternating between both CSVs.
+# The fake and true files are read side by side and every pair of chunks
+# is shuffled together, so incremental models never see one class only.
+# Encodings are picked with corpus_loader.file_encoding, so the streamed
+# text is the text training.py loads.
+def iter_chunks(fake_path, true_path, chunk_size=CHUNK_SIZE, seed=training.SEED):
+    readers = [
+        pd.read_csv(
+            path,
+            usecols=["Content", "Label"],
+            encoding=corpus_loader.file_encoding(path, encoding),
+            chunksize=chunk_size,
+        )
+        for path, encoding in (
+            (fake_path, training.FAKE_ENCODING),
+            (true_path, training.TRUE_ENCODING),
+        )
+    ]
+    random_state = np.random.RandomState(seed)
+    while readers:
+        chunks = []
+        for reader in list(readers):
+            chunk = next(reader, None)
+            if chunk is None:
+                readers.remove(reader)
+            else:
+                chunks.append(chunk)
+        if not chunks:
+            return
+        chunk = pd.concat(chunks, ignore_index=True).sample(
+            frac=1, random_state=random_state
+        )
+        chunk["Content"] = chunk["Content"].fillna("").astype(str)
+        chunk["Label"] = chunk["Label"].astype(int)
+        yield chunk
+
+
+# Function to flag the held-out rows of a chunk
+def is_test(contents, test_percent=TEST_PERCENT):
+    return np.fromiter(
+        (zlib.crc32(text.encode("utf-8")) % 100 < test_percent for text in contents),
+        dtype=bool,
+        count=len(contents),
+    )
+
+
+# Function to count the document frequency of every hashed feature over
+# the training rows and set the featurizer's IDF from it, with the same
+# smoothing as TfidfVectorizer. Returns the number of training rows.
+def fit_idf(featurizer, chunks, test_percent=TEST_PERCENT):
+    hashing = featurizer[:-1]
+    n_features = featurizer.named_steps["hashing"].n_features
+    document_frequency = np.zeros(n_features, dtype=np.int64)
+    documents = 0
+    for chunk in chunks:
+        contents = chunk["Content"][~is_test(chunk["Content"], test_percent)]
+        counts = hashing.transform(contents)
+        # Each row lists a feature at most once, so counting indices counts
+        # documents
+        document_frequency += np.bincount(counts.indices, minlength=n_features)
+        documents += counts.shape[0]
+    featurizer.named_steps["tfidf"].idf_ = (
+        np.log((1 + documents) / (1 + document_frequency)) + 1
+    )
+    return documents
+
+
+# Function to add the confusion matrix of a chunk to running totals
+def add_confusion(totals, name, y_true, y_pred):
+    totals[name] = totals.get(name, 0) + confusion_matrix(
+        y_true, y_pred, labels=CLASSES
+    )
+
+
+# Function to summarize a confusion matrix the way the reports are read
+def summarize(confusion):
+    true_negative, false_positive, false_negative, true_positive = confusion.ravel()
+    total = confusion.sum()
+    return {
+        "accuracy": (true_negative + true_positive) / total if total else 0.0,
+        "fake_recall": (
+            true_negative / (true_negative + false_positive)
+            if true_negative + false_positive
+            else 0.0
+        ),
+        "true_recall": (
+            true_positive / (true_positive + false_negative)
+            if true_positive + false_negative
+            else 0.0
+        ),
+        "test_rows": int(total),
+    }
+
+
+# Function to train the incremental classifiers over the streamed CSVs.
+# Memory is bounded by one chunk pair plus the fixed-size hashed IDF and
+# model weights, whatever the size of the corpus. Returns the featurizer,
+# the classifiers and their held-out metrics.
+def train_streaming(
+    fake_path,
+    true_path,
+    names=None,
+    chunk_size=CHUNK_SIZE,
+    epochs=EPOCHS,
+    test_percent=TEST_PERCENT,
+    n_features=N_FEATURES,
+):
+    featurizer = build_featurizer(n_features)
+    documents = fit_idf(
+        featurizer, iter_chunks(fake_path, true_path, chunk_size), test_percent
+    )
+    print(f"Counted document frequencies over {documents} training rows")
+
+    models = {name: MODELS[name]() for name in names or MODELS}
+    for epoch in range(epochs):
+        chunks = iter_chunks(fake_path, true_path, chunk_size, seed=epoch)
+        for chunk in chunks:
+            train_rows = chunk[~is_test(chunk["Content"], test_percent)]
+            if train_rows.empty:
+                continue
+            features = featurizer.transform(train_rows["Content"])
+            for model in models.values():
+                model.partial_fit(features, train_rows["Label"], classes=CLASSES)
+
+    confusions = {}
+    for chunk in iter_chunks(fake_path, true_path, chunk_size):
+        test_rows = chunk[is_test(chunk["Content"], test_percent)]
+        if test_rows.empty:
+            continue
+        features = featurizer.transform(test_rows["Content"])
+        for name, model in models.items():
+            add_confusion(confusions, name, test_rows["Label"], model.predict(features))
+    metrics = {name: summarize(confusions[name]) for name in models}
+    return featurizer, models, metrics
+
+
+# Function to train the notebook's in-memory TF-IDF + LogisticRegression on
+# the same split, as the baseline the streaming models are compared with
+def train_baseline(fake_path, true_path, test_percent=TEST_PERCENT):
+    data = training.load_corpus(fake_path, true_path)
+    test = is_test(data["Content"], test_percent)
+    featurizer = training.build_featurizer()
+    features = featurizer.fit_transform(data["Content"][~test])
+    model = LogisticRegression().fit(features, data["Label"][~test])
+    predictions = model.predict(featurizer.transform(data["Content"][test]))
+    confusion = confusion_matrix(data["Label"][test], predictions, labels=CLASSES)
+    return {"LR (in-memory TF-IDF)": summarize(confusion)}
+
+
+# Function to run a training function, returning its result, wall-clock
+# seconds and peak traced memory in MB
+def measured(function, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Train the classifiers out of core on hashed features"
+    )
+    parser.add_argument("--fake", default=training.FAKE_CSV)
+    parser.add_argument("--true", default=training.TRUE_CSV)
+    parser.add_argument(
+        "--model",
+        action="append",
+        choices=list(MODELS),
+        help="only train this classifier (repeatable)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--test-percent", type=int, default=TEST_PERCENT)
+    parser.add_argument("--n-features", type=int, default=N_FEATURES)
+    parser.add_argument(
+        "--baseline",
+        action="store_true",
+        help="also train the in-memory LogisticRegression baseline to compare",
+    )
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="persist the streaming models as a new version in --models-dir",
+    )
+    parser.add_argument("--models-dir", default=model_store.MODELS_DIR)
+    args = parser.parse_args()
+
+    (featurizer, models, metrics), elapsed, peak = measured(
+        train_streaming,
+        args.fake,
+        args.true,
+        names=args.model,
+        chunk_size=args.chunk_size,
+        epochs=args.epochs,
+        test_percent=args.test_percent,
+        n_features=args.n_features,
+    )
+    rows = [(name, result, elapsed, peak) for name, result in metrics.items()]
+    if args.baseline:
+        baseline, baseline_elapsed, baseline_peak = measured(
+            train_baseline, args.fake, args.true, args.test_percent
+        )
+        rows += [
+            (name, result, baseline_elapsed, baseline_peak)
+            for name, result in baseline.items()
+        ]
+
+    print(
+        f"{'model':<24}{'accuracy':>10}{'fake rec.':>11}{'true rec.':>11}"
+        f"{'seconds':>9}{'peak MB':>9}"
+    )
+    for name, result, seconds, megabytes in rows:
+        print(
+            f"{name:<24}{result['accuracy']:>10.4f}{result['fake_recall']:>11.4f}"
+            f"{result['true_recall']:>11.4f}{seconds:>9.1f}{megabytes:>9.1f}"
+        )
+
+    if args.save:
+        version = model_store.save(
+            featurizer,
+            models,
+            {
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "sklearn_version": sklearn.__version__,
+                "normalizer_version": text_normalizer.NORMALIZER_VERSION,
+                "data": {
+                    args.fake: training.file_digest(args.fake),
+                    args.true: training.file_digest(args.true),
+                },
+                "featurizer": "hashing",
+                "n_features": args.n_features,
+                "ngram_range": list(training.NGRAM_RANGE),
+                "epochs": args.epochs,
+                "test_percent": args.test_percent,
+                "metrics": metrics,
+            },
+            directory=args.models_dir,
+        )
+        print(f"Saved models as version {version} in {args.models_dir}")
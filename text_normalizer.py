@@ -0,0 +1,85 @@
+import re
+
+import pandas as pd
+
+# Version of the normalization rules; bump it whenever an output changes so
+# anything cached from normalized text is rebuilt
+NORMALIZER_VERSION = 1
+
+# Typographic quotes and dashes replaced by their ASCII counterparts
+_TYPOGRAPHIC = (
+    ("\u2019", "'"),
+    ("\u2018", "'"),
+    ("\u201c", '"'),
+    ("\u201d", '"'),
+    ("\u2013", "-"),
+    ("\u2014", "-"),
+)
+
+# HTML entities the scrapers decode. They are replaced one after the other
+# starting with "&amp;", so a double-escaped "&amp;lt;" decodes all the way
+# to "<" while "&amp;amp;" stops at "&amp;".
+_ENTITIES = (
+    ("&amp;", "&"),
+    ("&lt;", "<"),
+    ("&gt;", ">"),
+    ("&quot;", '"'),
+    ("&#039;", "'"),
+)
+
+# wordopt removes digits and [bracketed] text first; every later rule of
+# the original chain is subsumed by replacing non-word characters, except
+# for the underscore, which is a word character but also punctuation
+_DIGITS_AND_BRACKETS = re.compile(r"\[.*?\]|\d")
+_NON_WORD = re.compile(r"\W")
+
+
+# Function to clean scraped headlines and content: trim, decode HTML
+# entities, collapse whitespace and, when `typographic` is set, replace
+# typographic quotes and dashes
+def clean_text(text, typographic=True):
+    text = text.strip()
+    # Plain str.replace is much cheaper than a regex or str.translate pass,
+    # and most texts contain none of the characters, so check first
+    if typographic and not text.isascii():
+        for character, replacement in _TYPOGRAPHIC:
+            if character in text:
+                text = text.replace(character, replacement)
+    if "&" in text:
+        for entity, replacement in _ENTITIES:
+            if entity in text:
+                text = text.replace(entity, replacement)
+    # Splitting on runs of whitespace matches the \s+ rule; the text is
+    # already stripped and neither replacement introduces whitespace
+    return " ".join(text.split())
+
+
+# Function to prepare article text for vectorization: drop digits and
+# [bracketed] text, lowercase, and turn punctuation and other non-word
+# characters into spaces
+def wordopt(text):
+    text = _DIGITS_AND_BRACKETS.sub("", text).lower()
+    return _NON_WORD.sub(" ", text).replace("_", "")
+
+
+# Function to apply a per-text function to a whole batch, keeping the
+# index when given a pandas Series
+def _apply_batch(function, texts, *args):
+    if isinstance(texts, pd.Series):
+        return pd.Series(
+            [function(text, *args) for text in texts],
+            index=texts.index,
+            name=texts.name,
+            dtype=object,
+        )
+    return [function(text, *args) for text in texts]
+
+
+# Function to clean a whole Series or list of texts at once
+def clean_batch(texts, typographic=True):
+    return _apply_batch(clean_text, texts, typographic)
+
+
+# Function to run wordopt over a whole Series or list of texts at once
+def wordopt_batch(texts):
+    return _apply_batch(wordopt, texts)
@@ -0,0 +1,188 @@
+import argparse
+import time
+from functools import partial
+
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.tree import DecisionTreeClassifier
+
+import corpus_loader
+import feature_cache
+import model_store
+import text_normalizer
+
+# Scraped datasets the notebook trains on, with the encodings it reads them with
+FAKE_CSV = corpus_loader.FAKE_CSV
+TRUE_CSV = corpus_loader.TRUE_CSV
+FAKE_ENCODING = corpus_loader.FAKE_ENCODING
+TRUE_ENCODING = corpus_loader.TRUE_ENCODING
+
+# Vectorizer and split settings of the notebook
+MAX_FEATURES = 5000
+NGRAM_RANGE = (1, 2)
+TEST_SIZE = 0.3
+SEED = 42
+
+# Classifiers trained on the shared features, by the notebook's names
+MODELS = {
+    "LR": partial(LogisticRegression),
+    "DT": partial(DecisionTreeClassifier),
+    "RF": partial(RandomForestClassifier, n_estimators=100, random_state=42),
+}
+
+
+# Function to build the featurizer shared by every classifier: the
+# notebook's wordopt normalization followed by the TF-IDF vectorizer
+def build_featurizer(max_features=MAX_FEATURES, ngram_range=NGRAM_RANGE):
+    return Pipeline(
+        [
+            ("normalize", FunctionTransformer(text_normalizer.wordopt_batch)),
+            (
+                "tfidf",
+                TfidfVectorizer(max_features=max_features, ngram_range=ngram_range),
+            ),
+        ]
+    )
+
+
+# Function to hash a file so a version records exactly what it was trained on
+file_digest = corpus_loader.file_digest
+
+
+# Function to load the merged Content/Label corpus of both datasets, typed
+# and cached by the corpus loader
+def load_corpus(fake_path=FAKE_CSV, true_path=TRUE_CSV):
+    return corpus_loader.load_corpus(fake_path, true_path)
+
+
+# Function to fit the featurizer once and every chosen classifier on the
+# resulting features, reporting their scores on a held-out split. The
+# fitted featurizer and features come from the feature cache when the same
+# corpus was already vectorized the same way (`feature_cache_dir` None
+# disables it). With `incremental` the featurizer keeps the vocabulary it
+# was first fitted with as the corpus grows and only newly scraped rows
+# are vectorized; rows are then held out by a hash of their content rather
+# than by `seed`. Returns the fitted featurizer, the classifiers and the
+# metrics per classifier.
+def train(
+    data,
+    names=None,
+    test_size=TEST_SIZE,
+    seed=SEED,
+    featurizer=None,
+    feature_cache_dir=feature_cache.CACHE_DIR,
+    incremental=False,
+):
+    featurizer = featurizer if featurizer is not None else build_featurizer()
+    start = time.perf_counter()
+    if incremental:
+        if feature_cache_dir is None:
+            raise ValueError("incremental features need a feature cache directory")
+        featurizer, x_train_features, x_test_features, y_train, y_test = (
+            feature_cache.incremental_features(
+                data["Content"],
+                data["Label"],
+                featurizer,
+                test_percent=round(test_size * 100),
+                cache_dir=feature_cache_dir,
+            )
+        )
+    else:
+        featurizer, x_train_features, x_test_features, y_train, y_test = (
+            feature_cache.split_features(
+                data["Content"],
+                data["Label"],
+                featurizer,
+                test_size,
+                seed,
+                cache_dir=feature_cache_dir,
+            )
+        )
+    print(f"Vectorized {len(data)} documents in {time.perf_counter() - start:.1f}s")
+
+    models = {}
+    metrics = {}
+    for name in names or MODELS:
+        start = time.perf_counter()
+        model = MODELS[name]().fit(x_train_features, y_train)
+        fit_seconds = time.perf_counter() - start
+        predictions = model.predict(x_test_features)
+        print(f"{name} trained in {fit_seconds:.1f}s")
+        print(classification_report(y_test, predictions))
+        models[name] = model
+        metrics[name] = {
+            "accuracy": accuracy_score(y_test, predictions),
+            "fit_seconds": fit_seconds,
+            "report": classification_report(y_test, predictions, output_dict=True),
+        }
+    return featurizer, models, metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Train the fake news classifiers and persist them"
+    )
+    parser.add_argument("--fake", default=FAKE_CSV)
+    parser.add_argument("--true", default=TRUE_CSV)
+    parser.add_argument("--models-dir", default=model_store.MODELS_DIR)
+    parser.add_argument(
+        "--model",
+        action="append",
+        choices=list(MODELS),
+        help="only train this classifier (repeatable)",
+    )
+    parser.add_argument("--max-features", type=int, default=MAX_FEATURES)
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--feature-cache-dir", default=feature_cache.CACHE_DIR)
+    parser.add_argument(
+        "--no-feature-cache",
+        action="store_true",
+        help="vectorize the corpus even if its features are cached",
+    )
+    parser.add_argument(
+        "--incremental-features",
+        action="store_true",
+        help="keep the cached vocabulary and only vectorize newly scraped rows",
+    )
+    args = parser.parse_args()
+    if args.incremental_features and args.no_feature_cache:
+        parser.error("--incremental-features needs the feature cache")
+
+    data = load_corpus(args.fake, args.true)
+    featurizer, models, metrics = train(
+        data,
+        names=args.model,
+        test_size=args.test_size,
+        seed=args.seed,
+        featurizer=build_featurizer(max_features=args.max_features),
+        feature_cache_dir=None if args.no_feature_cache else args.feature_cache_dir,
+        incremental=args.incremental_features,
+    )
+    version = model_store.save(
+        featurizer,
+        models,
+        {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sklearn_version": sklearn.__version__,
+            "normalizer_version": text_normalizer.NORMALIZER_VERSION,
+            "data": {
+                args.fake: file_digest(args.fake),
+                args.true: file_digest(args.true),
+            },
+            "rows": len(data),
+            "max_features": args.max_features,
+            "ngram_range": list(NGRAM_RANGE),
+            "test_size": args.test_size,
+            "seed": args.seed,
+            "incremental_features": args.incremental_features,
+            "metrics": metrics,
+        },
+        directory=args.models_dir,
+    )
+    print(f"Saved models as version {version} in {args.models_dir}")